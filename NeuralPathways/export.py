@@ -0,0 +1,226 @@
+"""
+Headless report export: extracts pathways, aligns them with every attribute and writes the alignment figures
+and tables without opening a window.
+
+    python -m NeuralPathways.export attributes.csv activations.json -o report --figures png pdf --tables csv
+"""
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from joblib import Parallel, delayed
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+from sklearn.linear_model import LogisticRegression
+
+import NeuralPathways.session as s
+import NeuralPathways.pathways as p
+
+from NeuralPathways.loading import INSTANCE_IDS_KEY, activation_matrix, load_attribute_csv
+from NeuralPathways.models.pandas_model import PandasModel
+from NeuralPathways.utilities import AnovaFClassifier
+
+METHODS = OrderedDict([('pearson', p.CorrelationMethod.PEARSON),
+                       ('logreg', p.CorrelationMethod.LOG_REG),
+                       ('spearman', p.CorrelationMethod.SPEARMAN),
+                       ('anova', p.CorrelationMethod.ANOVA_F),
+                       ('mi', p.CorrelationMethod.MUTUAL_INFO)])
+FIGURE_FORMATS = ('png', 'svg', 'pdf')
+TABLE_FORMATS = ('csv', 'parquet')
+ALL_CLASSES = '<all classes>'
+
+# Pathway axes label every pathway up to this many, and let the locator thin them out above it
+MAX_LABELED_PATHWAYS = 60
+
+
+def load_session(attributes_file, activations_file, instance_id=""):
+    # Fill the session the way loading both files in the tool does
+    df, info = load_attribute_csv(attributes_file)
+    s.ATTRIBUTE_MODEL = PandasModel(df)
+    s.ATTRIBUTE_COLUMN_INFO = info
+    s.ATTRIBUTE_CHECKLIST_STATE = OrderedDict((a, p.attribute_state(a)) for a in df.columns)
+
+    with open(activations_file) as file:
+        document = json.load(file)
+    s.ACTIVATION_DICT = document
+    s.ACTIVATION_IDS = document.get(INSTANCE_IDS_KEY)
+    s.ACTIVATION_MATRIX, s.ACTIVATION_NEURONS = activation_matrix(document)
+
+    s.INSTANCE_ID_ATTRIBUTE = instance_id
+    p.join_instances()
+
+
+def coefficient_table():
+    # One row per (attribute, class) with its coefficient for every pathway
+    records = []
+    for attribute, clf in s.ATTRIBUTE_ALIGNMENT_CLFS.items():
+        coef = np.asarray(clf.coef_)
+        if coef.shape[0] > 1:
+            classes = list(clf.classes_)
+        elif isinstance(clf, AnovaFClassifier) or len(clf.classes_) > 2:
+            # The F statistic compares all classes at once; its single row belongs to none of them
+            classes = [ALL_CLASSES]
+        else:
+            # A binary classifier has a single row of coefficients, for its second class
+            classes = list(clf.classes_)[-1:]
+        for cls, values in zip(classes, coef):
+            records.append([attribute, str(cls)] + list(values))
+    return _pathway_frame(records)
+
+
+def significance_table(key):
+    # key is 'p_values' or 'q_values'
+    records = []
+    for attribute, significance in s.ATTRIBUTE_ALIGNMENT_PVALUES.items():
+        for cls, values in zip(significance['classes'], significance[key]):
+            records.append([attribute, str(cls)] + list(values))
+    return _pathway_frame(records)
+
+
+def summary_table():
+    records = []
+    for attribute, clf in s.ATTRIBUTE_ALIGNMENT_CLFS.items():
+        mean, std = s.ATTRIBUTE_ALIGNMENT_CV_SCORES.get(attribute, (np.nan, np.nan))
+        # Only logistic regression predicts classes; the other methods' accuracy would be a class share
+        score = np.nan
+        if isinstance(clf, LogisticRegression):
+            score = s.ATTRIBUTE_ALIGNMENT_SCORES.get(attribute, np.nan)
+        records.append([attribute, str(s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']), score, mean, std])
+    return pd.DataFrame(records, columns=['attribute', 'corr_class', 'score', 'cv_mean', 'cv_std'])
+
+
+def _pathway_frame(records):
+    n_pathways = s.PATHWAYS_ACTIVATIONS.shape[1]
+    return pd.DataFrame(records, columns=['attribute', 'class'] + [f"pathway_{k}" for k in range(n_pathways)])
+
+
+def write_table(df, path, fmt):
+    if fmt == 'parquet':
+        df.to_parquet(path + '.parquet', index=False)
+    else:
+        df.to_csv(path + '.csv', index=False)
+
+
+def _label_pathways(axis, n_pathways):
+    if n_pathways <= MAX_LABELED_PATHWAYS:
+        axis.set_major_locator(MaxNLocator(nbins=n_pathways, integer=True))
+    else:
+        axis.set_major_locator(MaxNLocator(nbins='auto', integer=True))
+    axis.set_major_formatter(FuncFormatter(lambda value, position: f"pathway_{int(round(value))}"))
+
+
+def render_alignment(path, title, values, colors, annotation, formats):
+    # One attribute's bar chart, saved once per format; runs in a worker process. Fixed margins rather than a
+    # layout engine, which would measure every label on every save.
+    width = max(8, len(values) * 0.15)
+    figure = Figure(figsize=(width, 4))
+    figure.subplots_adjust(left=0.8 / width, right=1 - 0.2 / width, bottom=0.3, top=0.9)
+    ax = figure.add_subplot(1, 1, 1)
+    ax.bar(np.arange(len(values)), values, color=colors, width=0.8)
+    ax.axhline(0, color='grey', linewidth=0.8)
+    ax.set_xlim(-0.5, len(values) - 0.5)
+    ax.set_title(title)
+    ax.set_ylabel("Alignment")
+    _label_pathways(ax.xaxis, len(values))
+    ax.tick_params(axis='x', labelrotation=60)
+    if annotation:
+        ax.text(0.99, 0.95, annotation, transform=ax.transAxes, ha='right', va='top', fontsize='small')
+
+    for fmt in formats:
+        figure.savefig(f"{path}.{fmt}")
+    return path
+
+
+def render_heatmap(path, attributes, grid, formats):
+    grid = np.asarray(grid, dtype=float)
+    figure = Figure(figsize=(12, max(4, min(len(attributes) * 0.2, 40))), layout='constrained')
+    ax = figure.add_subplot(1, 1, 1)
+    limit = np.abs(grid).max() or 1
+    image = ax.imshow(grid, cmap='coolwarm', vmin=-limit, vmax=limit, aspect='auto', interpolation='nearest')
+    figure.colorbar(image, ax=ax)
+
+    ax.yaxis.set_major_locator(MaxNLocator(nbins=min(len(attributes), 200), integer=True))
+    ax.yaxis.set_major_formatter(FuncFormatter(
+        lambda value, position: attributes[int(round(value))] if 0 <= int(round(value)) < len(attributes) else ""))
+    _label_pathways(ax.xaxis, grid.shape[1])
+    ax.tick_params(axis='x', labelrotation=60)
+    ax.set_title("Attribute/Pathway Alignment")
+
+    for fmt in formats:
+        figure.savefig(f"{path}.{fmt}")
+    return path
+
+
+def _file_name(i, attribute):
+    # Attribute names can hold anything; keep the index so the names stay unique
+    return f"{i:03d}_{re.sub(r'[^A-Za-z0-9_.-]+', '_', attribute)}"
+
+
+def export_report(output_dir, figure_formats=('png',), table_formats=('csv',), n_jobs=-1):
+    """
+    Writes every aligned attribute's bar chart, the heatmap of all of them, and the coefficient, p-value,
+    q-value and summary tables to output_dir. Figures are rendered by n_jobs worker processes.
+    """
+    os.makedirs(os.path.join(output_dir, 'alignments'), exist_ok=True)
+    n_pathways = s.PATHWAYS_ACTIVATIONS.shape[1]
+    attributes = list(s.ATTRIBUTE_ALIGNMENT_CLFS)
+
+    tables = {'coefficients': coefficient_table(), 'summary': summary_table()}
+    if s.ATTRIBUTE_ALIGNMENT_PVALUES:
+        tables['p_values'] = significance_table('p_values')
+        tables['q_values'] = significance_table('q_values')
+    for name, df in tables.items():
+        for fmt in table_formats:
+            write_table(df, os.path.join(output_dir, name), fmt)
+
+    if not figure_formats or not attributes:
+        return
+
+    tasks = [delayed(render_alignment)(os.path.join(output_dir, 'alignments', _file_name(i, attribute)),
+                                       f"{attribute} = {s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']}",
+                                       *p.alignment_bars(attribute, n_pathways), figure_formats)
+             for i, attribute in enumerate(attributes)]
+    tasks.append(delayed(render_heatmap)(os.path.join(output_dir, 'heatmap'), attributes,
+                                         [p.alignment_values(a, n_pathways) for a in attributes], figure_formats))
+    Parallel(n_jobs=n_jobs)(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m NeuralPathways.export',
+                                     description="Export alignment figures and tables without opening a window.")
+    parser.add_argument('attributes', help="attribute CSV file")
+    parser.add_argument('activations', help="activation JSON file")
+    parser.add_argument('-o', '--output', default='report', help="output directory (default: report)")
+    parser.add_argument('--figures', nargs='*', default=['png'], choices=FIGURE_FORMATS)
+    parser.add_argument('--tables', nargs='*', default=['csv'], choices=TABLE_FORMATS)
+    parser.add_argument('--method', default='pearson', choices=list(METHODS))
+    parser.add_argument('--reduction', default=s.DIMENSIONALITY_REDUCTION, choices=["PCA", "Factor Analysis"])
+    parser.add_argument('--variance', type=float, default=s.TOTAL_EXPLAINED_VARIANCE,
+                        help="fraction of variance the pathways should explain")
+    parser.add_argument('--instance-id', default="", help="attribute column joined with the activation instance_ids")
+    parser.add_argument('--permutations', type=int, default=0, help="permutations for significance (0 to skip)")
+    parser.add_argument('--folds', type=int, default=0, help="cross-validation folds, logistic regression only (0 to skip)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--jobs', type=int, default=-1, help="worker processes for rendering (default: all cores)")
+    args = parser.parse_args(argv)
+
+    load_session(args.attributes, args.activations, args.instance_id)
+
+    s.DIMENSIONALITY_REDUCTION = args.reduction
+    s.TOTAL_EXPLAINED_VARIANCE = args.variance
+    n_pathways, _ = p.extract_pathways()
+    print(f"{n_pathways} pathways extracted.")
+
+    p.compute_pathway_alignments(method=METHODS[args.method], permutations=args.permutations, folds=args.folds,
+                                 seed=args.seed)
+    export_report(args.output, args.figures, args.tables, n_jobs=args.jobs)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
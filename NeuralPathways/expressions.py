@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from pandas.core.computation.parsing import clean_column_name
+
+
+def evaluate_query(df, expression):
+    """
+    Evaluate a filter such as "label == 'PER' and len > 20" over whole columns at once and return a boolean
+    mask with one entry per row. Column names containing spaces can be quoted with backticks.
+    Raises ValueError if the expression is invalid or does not produce one boolean per row.
+    """
+    try:
+        result = df.eval(expression)
+    except Exception as e:
+        raise ValueError(f"Invalid query: {e}") from e
+
+    mask = np.asarray(result)
+    if mask.shape != (len(df.index),) or mask.dtype != bool:
+        raise ValueError("Query must produce a True/False value for every row.")
+    return mask
+
+
+def parse_definitions(text):
+    """
+    Parse derived attribute definitions, one "name = expression" per line. Blank lines and lines starting
+    with # are skipped. Returns a list of (name, expression); raises ValueError naming the offending line.
+    """
+    definitions = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        name, sep, expression = line.partition('=')
+        name, expression = name.strip(), expression.strip()
+        if not sep or not name or not expression or expression.startswith('='):
+            raise ValueError(f"Line {line_number}: expected 'name = expression'.")
+        definitions.append((name, expression))
+    return definitions
+
+
+class _DerivedNamespace(dict):
+    # Columns and helper functions visible to derived attribute expressions. Helper results are memoized per
+    # run, so definitions that share a regex or binning (e.g. match(text, 'ing$') & flag) compute it once.
+
+    def __init__(self, columns):
+        dict.__init__(self)
+        self._columns = {}
+        self._cache = {}
+        for name, series in columns.items():
+            self.add(name, series)
+        self.update({'col': self.col,
+                     'bin': self.bin,
+                     'qbin': self.qbin,
+                     'match': self.match,
+                     'length': self.length,
+                     'between': self.between,
+                     'where': self.where,
+                     'isin': self.isin,
+                     'np': np})
+
+    def add(self, name, series):
+        # Also under the name pandas gives `quoted names`, as in queries
+        self[name] = series
+        self[clean_column_name(name)] = series
+        self._columns[name] = series
+
+    def col(self, name):
+        # Columns whose names aren't valid identifiers, e.g. col('gold label')
+        return self._columns[name]
+
+    def _memoized(self, key, fn):
+        # Only helpers applied directly to a column are cached; key[1] is that column's name
+        series = key[1]
+        if not isinstance(series, pd.Series) or self._columns.get(series.name) is not series:
+            return fn()
+        key = (key[0], series.name) + key[2:]
+        try:
+            hash(key)
+        except TypeError:
+            return fn()
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def bin(self, series, bins, labels=None):
+        # Equal-width bins, or explicit edges if bins is a list; bin numbers unless labels are given
+        key = ('bin', series, tuple(bins) if isinstance(bins, list) else bins,
+               tuple(labels) if labels is not None else None)
+        return self._memoized(key, lambda: pd.cut(series, bins, labels=labels if labels is not None else False))
+
+    def qbin(self, series, q, labels=None):
+        # Quantile bins, so each bin holds roughly the same number of rows
+        key = ('qbin', series, q, tuple(labels) if labels is not None else None)
+        return self._memoized(key, lambda: pd.qcut(series, q, labels=labels if labels is not None else False,
+                                                   duplicates='drop'))
+
+    def match(self, series, pattern, case=True):
+        key = ('match', series, pattern, case)
+        return self._memoized(key, lambda: series.astype(str).str.contains(pattern, case=case, regex=True))
+
+    def length(self, series):
+        return self._memoized(('length', series), lambda: series.astype(str).str.len())
+
+    def between(self, series, low, high):
+        return series.between(low, high)
+
+    def where(self, condition, a, b):
+        return np.where(condition, a, b)
+
+    def isin(self, series, values):
+        return series.isin(values)
+
+
+def _derived_column(result, index):
+    if np.isscalar(result) or getattr(result, 'ndim', 1) != 1 or len(result) != len(index):
+        raise ValueError("expression must produce one value per row")
+
+    series = result.set_axis(index) if isinstance(result, pd.Series) else pd.Series(result, index=index)
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        series = series.astype('category')
+    return series
+
+
+def evaluate_derived_attributes(columns, definitions, batch_size=8, emit=None, progress=None, cancelled=None):
+    """
+    Evaluate derived attribute definitions over the given {name: Series} columns. Expressions are pandas eval
+    expressions, like queries, and work on whole columns at once. They may use the columns (`quoted` if
+    needed), the helpers bin, qbin, match, length, between, where, isin and col, numpy as np, and the
+    attributes defined before it. Calls to anything else are rejected by pandas.
+
+    Finished columns are passed to emit in batches of batch_size as {name: Series}, so callers can add them
+    while the rest are evaluated. Returns {name: error message} for the definitions that failed.
+    """
+    index = next(iter(columns.values())).index
+    namespace = _DerivedNamespace(columns)
+    errors = {}
+    batch = {}
+
+    for i, (name, expression) in enumerate(definitions):
+        if cancelled is not None and cancelled():
+            break
+
+        try:
+            if name in namespace:
+                raise ValueError(f"'{name}' already exists")
+            series = _derived_column(pd.eval(expression, resolvers=(namespace,)), index)
+        except Exception as e:
+            errors[name] = str(e)
+        else:
+            namespace.add(name, series.rename(name))
+            batch[name] = series.rename(name)
+
+        if len(batch) >= batch_size and emit is not None:
+            emit(batch)
+            batch = {}
+        if progress is not None:
+            progress(int(100 * (i + 1) / len(definitions)))
+
+    if batch and emit is not None:
+        emit(batch)
+    return errors
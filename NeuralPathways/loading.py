@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pandas.api.types import union_categoricals, is_integer_dtype
+
+# Columns with more classes than this are not offered for alignment
+MAX_ATTRIBUTE_CLASSES = 50
+
+# Text columns become categorical when at most this fraction of a chunk's values are distinct
+CATEGORICAL_RATIO = 0.5
+
+DEFAULT_CHUNKSIZE = 200000
+
+# Optional key of the activation JSON listing the instance id of every row, for joining with the attributes
+INSTANCE_IDS_KEY = "instance_ids"
+
+
+def _compact_chunk(chunk):
+    for col in chunk.columns:
+        series = chunk[col]
+        if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+            if series.nunique() <= max(MAX_ATTRIBUTE_CLASSES, CATEGORICAL_RATIO * len(series)):
+                chunk[col] = series.astype('category')
+        elif is_integer_dtype(series.dtype):
+            chunk[col] = pd.to_numeric(series, downcast='integer')
+    return chunk
+
+
+def _concat_column(parts):
+    if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+        # Recode every chunk against one sorted set of categories, so codes sort like the labels
+        return pd.Series(union_categoricals(parts, sort_categories=True), name=parts[0].name)
+
+    parts = [part.astype(object) if isinstance(part.dtype, pd.CategoricalDtype) else part for part in parts]
+    column = pd.concat(parts, ignore_index=True)
+    if is_integer_dtype(column.dtype):
+        column = pd.to_numeric(column, downcast='integer')
+    return column
+
+
+def column_info(series):
+    """
+    The classes and cardinality of a column, computed once at load time.
+
+    'classes' is the sorted list of distinct values, or None when there are more than MAX_ATTRIBUTE_CLASSES.
+    'class_rows' maps each of those classes to the ascending row indices holding it (None without classes).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        labels = series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, sort=True)
+
+    valid = codes >= 0
+    counts = np.bincount(codes[valid], minlength=len(labels))
+    present = np.flatnonzero(counts)
+
+    cardinality = len(present)
+    classes = sorted(labels[present]) if cardinality <= MAX_ATTRIBUTE_CLASSES else None
+
+    class_rows = None
+    if classes is not None:
+        # One stable sort groups the rows of every class, each group staying in row order
+        rows = np.flatnonzero(valid).astype(np.int32 if len(codes) < 2 ** 31 else np.int64)
+        rows = rows[np.argsort(codes[valid], kind='stable')]
+        groups = np.split(rows, np.cumsum(counts)[:-1])
+        class_rows = {labels[k]: groups[k] for k in present}
+
+    return {'classes': classes, 'cardinality': cardinality, 'class_rows': class_rows}
+
+
+def activation_matrix(document):
+    """
+    The activation JSON as one (instances, neurons) matrix, with the layers side by side, and the neuron
+    names ("<layer>:<index>").
+    """
+    if document is None:
+        return
+
+    arrs = []
+    column_names = []
+    for k, v in document.items():
+        if k == INSTANCE_IDS_KEY:
+            continue
+        elif len(v) == 0:
+            print('Skipping {} because there are no data instances.'.format(k))
+            continue
+        elif len(v[0]) == 0:
+            print('Skipping {} because there are no neurons.'.format(k))
+            continue
+
+        arrs.append(np.asarray(v, dtype=np.float64))
+        column_names.extend([f"{k}:{n}" for n in range(len(v[0]))])
+
+    return np.concatenate(arrs, axis=1), column_names
+
+
+def load_attribute_csv(file_name, chunksize=DEFAULT_CHUNKSIZE, progress=None, cancelled=None):
+    """
+    Read an attribute table in chunks, storing repeated labels as categoricals and integers in the smallest
+    dtype that holds them. Returns (df, info) where info maps each column to its column_info, or None if
+    cancelled.
+    """
+    total_bytes = max(os.path.getsize(file_name), 1)
+    chunks = []
+
+    with open(file_name, 'rb') as file:
+        for chunk in pd.read_csv(file, chunksize=chunksize):
+            chunks.append(_compact_chunk(chunk))
+
+            if cancelled is not None and cancelled():
+                return None
+            if progress is not None:
+                progress(int(100 * min(file.tell() / total_bytes, 1.0)))
+
+    if len(chunks) == 0:
+        df = pd.read_csv(file_name)
+    else:
+        df = pd.DataFrame({col: _concat_column([chunk[col] for chunk in chunks]) for col in chunks[0].columns})
+
+    info = {col: column_info(df[col]) for col in df.columns}
+    return df, info
+
+
+def _join_report(rows, n_activations, duplicate_ids=0):
+    matched_rows = rows[rows >= 0]
+    used = np.count_nonzero(np.bincount(matched_rows, minlength=n_activations))
+    report = {'matched': len(matched_rows),
+              'attributes_only': len(rows) - len(matched_rows),
+              'activations_only': n_activations - duplicate_ids - used,
+              'duplicate_ids': duplicate_ids}
+
+    # None means attribute row i is activation row i for every row, so no gathering is needed
+    if len(rows) == n_activations and np.array_equal(rows, np.arange(n_activations)):
+        rows = None
+    return rows, report
+
+
+def align_positions(n_attributes, n_activations):
+    """
+    Match attribute rows to activation rows by position. Returns (rows, report) like align_instances.
+    """
+    rows = np.arange(n_attributes)
+    rows[rows >= n_activations] = -1
+    return _join_report(rows, n_activations)
+
+
+def align_instances(attribute_ids, activation_ids):
+    """
+    Join attribute rows to activation rows by instance id through a hash index, so neither input needs to be
+    sorted and they may only partly overlap.
+
+    Returns (rows, report) where rows[i] is the activation row of attribute row i (-1 when it has no
+    activations), or None when every row already matches the activation row at the same position.
+    report counts the matched rows, the rows found in only one input and the duplicated activation ids.
+    """
+    attribute_ids = pd.Index(attribute_ids)
+    activation_ids = pd.Index(activation_ids)
+    n_activations = len(activation_ids)
+    if attribute_ids.inferred_type != activation_ids.inferred_type:
+        # e.g. integer ids in the CSV and string ids in the JSON
+        attribute_ids = attribute_ids.astype(str)
+        activation_ids = activation_ids.astype(str)
+
+    # Duplicated activation ids are ambiguous; the first row with each id is used
+    positions = np.arange(n_activations)
+    duplicate_ids = 0
+    if not activation_ids.is_unique:
+        duplicated = activation_ids.duplicated()
+        duplicate_ids = int(duplicated.sum())
+        activation_ids = activation_ids[~duplicated]
+        positions = positions[~duplicated]
+
+    indexer = activation_ids.get_indexer(attribute_ids)
+    rows = np.where(indexer >= 0, positions[np.maximum(indexer, 0)], -1)
+    return _join_report(rows, n_activations, duplicate_ids)
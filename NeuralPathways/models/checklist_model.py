@@ -0,0 +1,98 @@
+from qtpy import QtCore
+from qtpy.QtCore import Qt, Signal
+
+import NeuralPathways.session as s
+
+
+class AttributeChecklistModel(QtCore.QAbstractTableModel):
+    # Table view of ATTRIBUTE_CHECKLIST_STATE. The state dicts stay the single source of truth; the model only
+    # keeps the list of attribute names it shows, so a refresh costs no widgets and painting is O(visible rows).
+    ATTRIBUTE, THRESHOLD, CORR_CLASS, DISPLAY = range(4)
+    HEADERS = ("Attributes", "Threshold", "Corr. Class", "Display?")
+
+    # Role used by the class delegate to fetch an attribute's classes
+    ClassesRole = Qt.UserRole + 1
+
+    checkedChanged = Signal(str)
+    thresholdChanged = Signal(str)
+
+    def __init__(self, parent=None):
+        QtCore.QAbstractTableModel.__init__(self, parent=parent)
+        self._attributes = []
+
+    def refresh(self):
+        # Gold and predicted label columns are chosen elsewhere, so they are not listed
+        self.beginResetModel()
+        self._attributes = [a for a in s.ATTRIBUTE_CHECKLIST_STATE
+                            if a != s.GOLD_LABEL_ATTRIBUTE and a != s.PRED_LABEL_ATTRIBUTE]
+        self.endResetModel()
+
+    def attribute(self, row):
+        return self._attributes[row]
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._attributes)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+
+    def flags(self, index):
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.DISPLAY:
+            flags |= Qt.ItemIsUserCheckable
+        elif index.column() in (self.THRESHOLD, self.CORR_CLASS):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return
+
+        attribute = self._attributes[index.row()]
+        state = s.ATTRIBUTE_CHECKLIST_STATE[attribute]
+        column = index.column()
+
+        if column == self.ATTRIBUTE and role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return attribute
+        elif column == self.THRESHOLD and role == Qt.DisplayRole:
+            return str(state['threshold'])
+        elif column == self.THRESHOLD and role == Qt.EditRole:
+            return float(state['threshold'])
+        elif column == self.CORR_CLASS and role in (Qt.DisplayRole, Qt.EditRole):
+            return str(state['corr_class'])
+        elif column == self.CORR_CLASS and role == self.ClassesRole:
+            return state['classes']
+        elif column == self.DISPLAY and role == Qt.CheckStateRole:
+            return Qt.Checked if state['checked'] else Qt.Unchecked
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+
+        attribute = self._attributes[index.row()]
+        state = s.ATTRIBUTE_CHECKLIST_STATE[attribute]
+        column = index.column()
+
+        if column == self.DISPLAY and role == Qt.CheckStateRole:
+            state['checked'] = Qt.CheckState(value) == Qt.Checked
+            self.dataChanged.emit(index, index)
+            self.checkedChanged.emit(attribute)
+            return True
+        elif column == self.THRESHOLD and role == Qt.EditRole:
+            state['threshold'] = float(value)
+            self.dataChanged.emit(index, index)
+            self.thresholdChanged.emit(attribute)
+            return True
+        elif column == self.CORR_CLASS and role == Qt.EditRole:
+            # Keep the class itself rather than its text, so it compares equal to the fitted classes
+            matches = [cls for cls in state['classes'] if str(cls) == str(value)]
+            if len(matches) == 0:
+                return False
+            state['corr_class'] = matches[0]
+            self.dataChanged.emit(index, index)
+            return True
+        return False
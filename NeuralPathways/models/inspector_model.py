@@ -0,0 +1,55 @@
+from qtpy import QtCore
+from qtpy.QtCore import Qt
+
+import numpy as np
+
+
+class InspectorModel(QtCore.QAbstractTableModel):
+    # Lazy view of the instances that most (or least) activate a pathway. It holds only the attribute row
+    # indices and their activations; cells are looked up and formatted when they are painted.
+
+    def __init__(self, valueHeader="Pathway Activation", parent=None):
+        QtCore.QAbstractTableModel.__init__(self, parent=parent)
+        self.headers = ("Data", "Attribute Label", valueHeader)
+        self._rows = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros(0)
+        self._data = None
+        self._labels = None
+
+    def setInstances(self, rows, values, data, labels):
+        # rows are attribute rows in display order, values the number shown for each (an activation or a
+        # distance); data and labels are the full attribute columns
+        self.beginResetModel()
+        self._rows = rows
+        self._values = values
+        self._data = data
+        self._labels = labels
+        self.endResetModel()
+
+    def clear(self):
+        self.setInstances(np.zeros(0, dtype=np.int64), np.zeros(0), None, None)
+
+    def sourceRow(self, row):
+        return int(self._rows[row])
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return
+
+        row = index.row()
+        if index.column() == 0:
+            return str(self._data.iat[self._rows[row]])
+        elif index.column() == 1:
+            return str(self._labels.iat[self._rows[row]])
+        else:
+            return f"{self._values[row]:.03f}"
@@ -104,6 +104,12 @@ class InitializerDataModel(NodeDataModel):
 
         self._result = None
 
+        # Variables whose probability tables alone changed since the last reset; any other edit rebuilds
+        self._stale_nodes = set()
+        self._rebuild = True
+        # Every variable's (CPD, parents, error) as last validated
+        self._checked = {}
+
         if InitializerDataModel.instance is None:
             InitializerDataModel.instance = self
             s.CAUSAL_GRAPH_INITIALIZER = self
@@ -131,17 +137,87 @@ class InitializerDataModel(NodeDataModel):
         s.CAUSAL_GRAPH_DEFINITION = BayesianNetwork()
         self._result = InitializerData(self.instance)
 
-    def mark_stale(self):
+    def mark_stale(self, node=None):
+        """
+        node is a variable node whose probability table changed, and is patched into the graph on the next
+        reset. Without a node (labels, parents or connections changed) the next reset rebuilds the graph.
+        """
+        if node is None:
+            self._rebuild = True
+        else:
+            self._stale_nodes.add(node)
         self._validation_state = NodeValidationState.error
         self._validation_message = "Graph has changed. Re-generate graph."
         self.data_invalidated.emit(0)
 
     def reset(self):
         print("INITIALIZER RESET")
-        self.compute()
-        self._validation_state = NodeValidationState.valid
-        self._validation_message = 'Graph refreshed.'
-        self.data_updated.emit(0)
+        if self._rebuild or s.CAUSAL_GRAPH_DEFINITION is None:
+            self._rebuild = False
+            self._stale_nodes.clear()
+            self.compute()
+            # Every variable node recompiles itself into the new graph as the initializer data reaches it
+            self.data_updated.emit(0)
+        else:
+            for node in self._stale_nodes:
+                if node.validation_state() == NodeValidationState.valid:
+                    node.compute()
+            self._stale_nodes.clear()
+
+        # A node found invalid while rebuilding asked for another rebuild; keep the stale message
+        if not self._rebuild:
+            self._validate()
+        self.embedded_widget_size_updated.emit()
+
+    def compile_node(self, name, cpd, parents=()):
+        # Patch one variable into the graph: its node, its incoming edges and its CPD
+        graph = s.CAUSAL_GRAPH_DEFINITION
+        graph.add_node(name)
+        for parent in set(graph.get_parents(name)) - set(parents):
+            graph.remove_edge(parent, name)
+        for parent in parents:
+            if not graph.has_edge(parent, name):
+                graph.add_edge(parent, name)
+
+        # Replaced in place; add_cpds would scan and warn on every replacement
+        for i, previous in enumerate(graph.cpds):
+            if previous.variable == name:
+                graph.cpds[i] = cpd
+                break
+        else:
+            graph.add_cpds(cpd)
+
+    def _validate(self):
+        # The checks of BayesianNetwork.check_model, per variable, repeated only for CPDs or parents that changed
+        graph = s.CAUSAL_GRAPH_DEFINITION
+        cpds = {cpd.variable: cpd for cpd in graph.cpds}
+        checked = {}
+        for node in graph.nodes():
+            cpd, parents = cpds.get(node), set(graph.get_parents(node))
+            previous = self._checked.get(node)
+            if previous is not None and previous[0] is cpd and previous[1] == parents:
+                checked[node] = previous
+            else:
+                checked[node] = (cpd, parents, self._check_cpd(node, cpd, parents))
+        self._checked = checked
+
+        errors = [error for _, _, error in checked.values() if error is not None]
+        if errors:
+            self._validation_state = NodeValidationState.error
+            self._validation_message = errors[0]
+        else:
+            self._validation_state = NodeValidationState.valid
+            self._validation_message = 'Graph refreshed.'
+
+    @staticmethod
+    def _check_cpd(node, cpd, parents):
+        if cpd is None:
+            return f"{node} has no probability table."
+        if set(cpd.variables[1:]) != parents:
+            return f"The probability table of {node} does not match its parents."
+        if not np.allclose(cpd.get_values().sum(axis=0), 1, atol=0.01):
+            return f"The probabilities of {node} do not sum to 1."
+        return None
 
 
 class ExogenousVariableDataModel(NodeDataModel):
@@ -259,10 +335,9 @@ class ExogenousVariableDataModel(NodeDataModel):
             self.data_updated.emit(0)
             return False
 
-        # Otherwise, the node is valid
+        # Otherwise, the node is valid; the output is sent once computed
         self._validation_state = NodeValidationState.valid
         self._validation_message = ''
-        self.data_updated.emit(0)
         return True
 
     @contextlib.contextmanager
@@ -338,8 +413,8 @@ class BinomialExogenousVariableModel(ExogenousVariableDataModel):
         self._probability_choice.valueChanged.connect(self.on_probability_changed)
 
     def on_probability_changed(self):
-        s.CAUSAL_GRAPH_INITIALIZER.mark_stale()
-        self.data_updated.emit(0)
+        # The output variable is unchanged, so the children need not hear about it
+        s.CAUSAL_GRAPH_INITIALIZER.mark_stale(self)
 
     def compute(self):
         print("BINOMIAL NODE COMPUTE")
@@ -349,11 +424,9 @@ class BinomialExogenousVariableModel(ExogenousVariableDataModel):
             self._result = None
             return
 
-        s.CAUSAL_GRAPH_DEFINITION.add_node(self._var_name)
-
         p = self._probability_choice.value()
         cpd_table = TabularCPD(self._var_name, 2, [[1-p], [p]])
-        s.CAUSAL_GRAPH_DEFINITION.add_cpds(cpd_table)
+        s.CAUSAL_GRAPH_INITIALIZER.compile_node(self._var_name, cpd_table)
 
         print(s.CAUSAL_GRAPH_DEFINITION)
 
@@ -390,6 +463,7 @@ class ObservedExogenousVariableModel(ExogenousVariableDataModel):
         self._attribute_choice.addItems([a for a in s.ATTRIBUTE_CHECKLIST_STATE])
         self._attribute_choice.currentTextChanged.connect(self.on_choice)
         s.sig_attribute_loaded.valueUpdated.connect(self.on_attribute_load)
+        s.sig_attributes_added.valueUpdated.connect(self.on_attribute_load)
 
         self.main_widget.node_layout.addWidget(self._attribute_choice)
 
@@ -436,8 +510,10 @@ class ObservedExogenousVariableModel(ExogenousVariableDataModel):
 
     def on_attribute_load(self):
         options = ['<None Selected>'] + [a for a in s.ATTRIBUTE_CHECKLIST_STATE]
+        current = self._attribute_choice.currentText()
         self._attribute_choice.clear()
         self._attribute_choice.addItems(options)
+        self._attribute_choice.setCurrentText(current)
 
 
 class VariableInputNodeModel(NodeDataModel):
@@ -586,6 +662,8 @@ class EndogenousVariableDataModel(VariableInputNodeModel):
         self.node_label.textChanged.connect(self.on_node_label_changed)
 
         self._parents = {}
+        # (graph, parent names) this node was last compiled into
+        self._compiled = None
 
     @property
     def caption(self):
@@ -595,6 +673,9 @@ class EndogenousVariableDataModel(VariableInputNodeModel):
     def num_parents(self):
         return self.num_ports['input']
 
+    def _parent_names(self):
+        return sorted([parent.variable_name for _, parent in self._parents.items()])
+
     def on_node_label_changed(self):
         # TODO Ensure that node id is unique
         self._var_name = self.node_label.text()
@@ -627,10 +708,9 @@ class EndogenousVariableDataModel(VariableInputNodeModel):
             self.data_updated.emit(0)
             return False
 
-        # Otherwise, the node is valid
+        # Otherwise, the node is valid; the output is sent once computed
         self._validation_state = NodeValidationState.valid
         self._validation_message = ''
-        self.data_updated.emit(0)
         return True
 
     @contextlib.contextmanager
@@ -678,8 +758,14 @@ class EndogenousVariableDataModel(VariableInputNodeModel):
         self._parents[port.index] = data
 
         if self._check_inputs():
+            # Every parent sends its output as it computes; once the node is in this graph with these parents,
+            # recomputing would only send the same output on to the children again
+            compiled = (s.CAUSAL_GRAPH_DEFINITION, self._parent_names())
+            if self._compiled is not None and self._compiled[0] is compiled[0] and self._compiled[1] == compiled[1]:
+                return
             with self._compute_lock():
                 self.compute()
+            self._compiled = compiled
         else:
             s.CAUSAL_GRAPH_INITIALIZER.mark_stale()
 
@@ -742,19 +828,12 @@ class TabularEndogenousVariableDataModel(EndogenousVariableDataModel):
         print("TABLUAR NODE COMPUTE")
 
         # Get list of parents
-        parents = sorted([parent.variable_name for _, parent in self._parents.items()])
-
-        # Create node
-        s.CAUSAL_GRAPH_DEFINITION.add_node(self._var_name)
+        parents = self._parent_names()
 
         print(self._table)
         table_cpd = TabularCPD(self._var_name, 2, self._table,
                                 evidence=parents, evidence_card=[2] * len(parents))
-        s.CAUSAL_GRAPH_DEFINITION.add_cpds(table_cpd)
-
-        # Create edges
-        for parent in parents:
-            s.CAUSAL_GRAPH_DEFINITION.add_edge(parent, self._var_name)
+        s.CAUSAL_GRAPH_INITIALIZER.compile_node(self._var_name, table_cpd, parents)
 
         print(s.CAUSAL_GRAPH_DEFINITION)
 
@@ -803,8 +882,8 @@ class TabularEndogenousVariableDataModel(EndogenousVariableDataModel):
 
         self._draw_table()
 
-        s.CAUSAL_GRAPH_INITIALIZER.mark_stale()
-        self.data_updated.emit(0)
+        # Only this node's probability table changed; its output variable did not
+        s.CAUSAL_GRAPH_INITIALIZER.mark_stale(self)
 
 
 """
@@ -1,26 +1,116 @@
+from collections import OrderedDict
+
 from qtpy import QtCore
 
+import numpy as np
 import pandas as pd
 
 
 class PandasModel(QtCore.QAbstractTableModel):
+    # Number of formatted cells kept around; a screenful of cells is far smaller than this
+    CACHE_SIZE = 4096
+
     def __init__(self, df=pd.DataFrame(), parent=None):
         QtCore.QAbstractTableModel.__init__(self, parent=parent)
         self.df = df
 
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+        self._refreshCache()
+
+    def _refreshCache(self):
+        # Header labels are looked up on every paint, so keep them instead of rebuilding lists per call
+        self._columnLabels = self._df.columns.tolist()
+        self._index = self._df.index
+        self._columnArrays = {}
+        self._textCache = OrderedDict()
+
+        # View layer: display row i shows source row self._rows[i] (None means every row, in the frame's
+        # own order). Sorting and filtering only change this map; the frame itself is never reordered or
+        # copied, so it stays aligned with the activations.
+        self._sortKeys = {}
+        self._order = None
+        self._mask = None
+        self._rows = None
+
+    def _columnArray(self, column):
+        # Per-column NumPy storage, built the first time a column is painted
+        if column not in self._columnArrays:
+            series = self._df.iloc[:, column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                self._columnArrays[column] = (series.cat.codes.to_numpy(), series.cat.categories.to_numpy())
+            else:
+                self._columnArrays[column] = (series.to_numpy(), None)
+        return self._columnArrays[column]
+
+    def sourceRow(self, row):
+        return row if self._rows is None else int(self._rows[row])
+
+    def sourceRows(self):
+        return np.arange(len(self._df.index)) if self._rows is None else self._rows
+
+    def _updateRows(self):
+        if self._mask is None:
+            self._rows = self._order
+        elif self._order is None:
+            self._rows = np.flatnonzero(self._mask)
+        else:
+            self._rows = self._order[self._mask[self._order]]
+
+    def setRowMask(self, mask):
+        # Show only the rows where mask is True (None shows every row), keeping the current sort
+        self.beginResetModel()
+        self._mask = None if mask is None else np.asarray(mask, dtype=bool)
+        self._updateRows()
+        self.endResetModel()
+
+    def _sortKey(self, column, ascending=True):
+        # Stable argsort of a column in either order, with missing values last as pandas sorts them; computed
+        # once per column and order
+        if (column, ascending) not in self._sortKeys:
+            series = self._df.iloc[:, column]
+            if isinstance(series.dtype, pd.CategoricalDtype) and not series.cat.ordered:
+                # Categories are not necessarily in label order, so rank the labels first
+                ranks = np.argsort(np.argsort(series.cat.categories.to_numpy(), kind='stable'))
+                codes = series.cat.codes.to_numpy()
+                values, missing = np.where(codes >= 0, ranks[codes], -1), codes < 0
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                missing = values < 0
+            elif series.dtype.kind in 'biuf':
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+                missing = np.isnan(values)
+            else:
+                values, _ = pd.factorize(series, sort=True)
+                missing = values < 0
+            self._sortKeys[(column, ascending)] = np.lexsort((values if ascending else -values, missing))
+        return self._sortKeys[(column, ascending)]
+
+    def _value(self, row, column):
+        values, categories = self._columnArray(column)
+        if categories is None:
+            return values[row]
+
+        code = values[row]
+        return categories[code] if code >= 0 else float('nan')
+
     def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
         if role != QtCore.Qt.DisplayRole:
             return
 
         if orientation == QtCore.Qt.Horizontal:
             try:
-                return self.df.columns.tolist()[section]
+                return self._columnLabels[section]
             except (IndexError,):
                 return
         elif orientation == QtCore.Qt.Vertical:
             try:
-                # return self.df.index.tolist()
-                return self.df.index.tolist()[section]
+                return str(self._index[self.sourceRow(section)])
             except (IndexError,):
                 return
 
@@ -31,34 +121,62 @@ class PandasModel(QtCore.QAbstractTableModel):
         if not index.isValid():
             return
 
-        return str(self.df.iloc[index.row(), index.column()])
+        key = (self.sourceRow(index.row()), index.column())
+        text = self._textCache.get(key)
+        if text is None:
+            text = str(self._value(*key))
+            self._textCache[key] = text
+            if len(self._textCache) > self.CACHE_SIZE:
+                self._textCache.popitem(last=False)
+        else:
+            self._textCache.move_to_end(key)
+
+        return text
 
     def setData(self, index, value, role):
-        row = self.df.index[index.row()]
-        col = self.df.columns[index.column()]
+        row = self.sourceRow(index.row())
+        col = index.column()
         if hasattr(value, 'toPyObject'):
             value = value.toPyObject()
         else:
-            dtype = self.df[col].dtype
-            if dtype != object:
+            dtype = self.df.iloc[:, col].dtype
+            if dtype != object and not isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
                 value = None if value == '' else dtype.type(value)
-        self.df.set_value(row, col, value)
+        self.df.iat[row, col] = value
+
+        self._columnArrays.pop(col, None)
+        self._sortKeys.pop((col, True), None)
+        self._sortKeys.pop((col, False), None)
+        self._textCache.pop((row, col), None)
+        self.dataChanged.emit(index, index)
         return True
 
     def rowCount(self, parent=QtCore.QModelIndex()):
-        return len(self.df.index)
+        return len(self.df.index) if self._rows is None else len(self._rows)
 
     def columnCount(self, parent=QtCore.QModelIndex()):
         return len(self.df.columns)
 
     def sort(self, column, order):
-        colname = self.df.columns.tolist()[column]
         self.layoutAboutToBeChanged.emit()
-        self.df.sort_values(colname, ascending=order == QtCore.Qt.AscendingOrder, inplace=True)
-        self.df.reset_index(inplace=True, drop=True)
+        if column < 0 or column >= len(self._columnLabels):
+            self._order = None
+        else:
+            self._order = self._sortKey(column, ascending=order == QtCore.Qt.AscendingOrder)
+        self._updateRows()
         self.layoutChanged.emit()
 
+    def addColumns(self, columns):
+        # Append {name: Series} as new columns in place; existing columns keep their caches
+        first = len(self._columnLabels)
+        self.beginInsertColumns(QtCore.QModelIndex(), first, first + len(columns) - 1)
+        for name, values in columns.items():
+            self._df[name] = values
+        self._columnLabels = self._df.columns.tolist()
+        self.endInsertColumns()
+
     def updateDataframe(self, df):
-        self.layoutAboutToBeChanged.emit()
+        # The new frame can have other rows and columns, which a layout change cannot announce
+        self.beginResetModel()
         self.df = df
-        self.layoutChanged.emit()
+        self.endResetModel()
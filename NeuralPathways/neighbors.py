@@ -0,0 +1,47 @@
+import numpy as np
+
+from sklearn.neighbors import KDTree
+
+# Above this many pathways a KD-tree prunes little, so the normalized dot-product index is used instead
+MAX_TREE_DIMENSIONS = 16
+
+
+class NeighborIndex:
+    """
+    Nearest-neighbor index over the rows of a pathway activation matrix.
+
+    Low-dimensional matrices get a KD-tree (euclidean distance). Higher-dimensional ones are stored with
+    unit-length float32 rows, and a query is a single matrix-vector product (cosine distance, 1 - cos).
+    """
+
+    def __init__(self, X, leaf_size=40):
+        X = np.asarray(X)
+        self.n_samples = X.shape[0]
+        self.metric = 'euclidean' if X.shape[1] <= MAX_TREE_DIMENSIONS else 'cosine'
+
+        if self.metric == 'euclidean':
+            self._tree = KDTree(X, leaf_size=leaf_size)
+            self._X = X
+        else:
+            norms = np.linalg.norm(X, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            self._tree = None
+            self._X = (X / norms).astype(np.float32)
+
+    def query(self, row, k):
+        """
+        The k rows nearest to the given row, excluding the row itself, and their distances, nearest first.
+        """
+        k = min(k + 1, self.n_samples)
+
+        if self._tree is not None:
+            distances, rows = self._tree.query(self._X[row:row + 1], k=k)
+            distances, rows = distances[0], rows[0]
+        else:
+            distances = 1 - self._X @ self._X[row]
+            rows = np.argpartition(distances, k - 1)[:k]
+            rows = rows[np.argsort(distances[rows])]
+            distances = distances[rows]
+
+        keep = rows != row
+        return rows[keep][:k - 1], distances[keep][:k - 1]
@@ -1,19 +1,32 @@
 import numpy as np
 
+from collections import OrderedDict
 from enum import Enum
+from joblib import Parallel, delayed
 from sklearn.decomposition import PCA, FactorAnalysis, FastICA
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import cohen_kappa_score
+from sklearn.model_selection import KFold
 from sklearn.preprocessing import StandardScaler
 from sklearn.exceptions import ConvergenceWarning
 
 import NeuralPathways.session as s
-from NeuralPathways.utilities import PearsonCorrelationClassifier
+from NeuralPathways.loading import align_instances, align_positions, column_info
+from NeuralPathways.stats import (indicator_matrix, permutation_pvalues, fdr_bh, rank_transform,
+                                  top_correlated_columns, conjunction_search)
+from NeuralPathways.utilities import PearsonCorrelationClassifier, AnovaFClassifier, MutualInformationClassifier
 
 
 class CorrelationMethod(Enum):
     PEARSON = 0
     LOG_REG = 1
+    SPEARMAN = 2
+    ANOVA_F = 3
+    MUTUAL_INFO = 4
+
+# Methods whose bars are per-class correlations, which is what the permutation test measures. Logistic
+# regression weights are a different statistic, so they are not colored by it.
+CORRELATION_METHODS = (CorrelationMethod.PEARSON, CorrelationMethod.SPEARMAN)
 
 def fa_pathways(X, explained_variance_required=0.999):
     exp_var = 0.0
@@ -48,6 +61,8 @@ def fa_pathways(X, explained_variance_required=0.999):
     return fa, pathways, fa.n_components, prop_var_exp
 
 def extract_pathways(**args):
+    s.PATHWAYS_ORDERINGS = None
+    s.PATHWAYS_NEIGHBOR_INDEX = None
 
     if s.DIMENSIONALITY_REDUCTION == "PCA":
         s.PATHWAYS_MODEL = PCA(n_components=s.TOTAL_EXPLAINED_VARIANCE)
@@ -63,30 +78,439 @@ def extract_pathways(**args):
 def compute_pathway_alignments(**args):
     s.ATTRIBUTE_ALIGNMENT_CLFS = {}
     s.ATTRIBUTE_ALIGNMENT_SCORES = {}
+    s.ATTRIBUTE_ALIGNMENT_PVALUES = {}
+    s.ATTRIBUTE_ALIGNMENT_CV_SCORES = {}
 
     if s.PATHWAYS_ACTIVATIONS is None:
         print("ERROR: pathways must be extracted.")
 
-    if args['method'] != CorrelationMethod.LOG_REG and args['method'] != CorrelationMethod.PEARSON:
+    if not isinstance(args['method'], CorrelationMethod):
         print("ERROR: unknown correlation method attempted")
 
+    rows = alignment_rows()
+    X = _alignment_inputs(args['method'], rows)
+
     for attribute, state in s.ATTRIBUTE_CHECKLIST_STATE.items():
         if not state['checked']:
             continue
 
-        if args['method'] == CorrelationMethod.LOG_REG:
-            clf = LogisticRegression()
-        else:
-            clf = PearsonCorrelationClassifier()
+        clf = _make_classifier(args['method'])
+        y = attribute_values(attribute, rows)
 
         try:
-            clf.fit(s.PATHWAYS_ACTIVATIONS, s.ATTRIBUTE_MODEL.df[attribute])
+            clf.fit(X, y)
 
             s.ATTRIBUTE_ALIGNMENT_CLFS[attribute] = clf
-            s.ATTRIBUTE_ALIGNMENT_SCORES[attribute] = clf.score(s.PATHWAYS_ACTIVATIONS, s.ATTRIBUTE_MODEL.df[attribute])
+            s.ATTRIBUTE_ALIGNMENT_SCORES[attribute] = clf.score(X, y)
 
-            preds = clf.predict(s.PATHWAYS_ACTIVATIONS)
+            preds = clf.predict(X)
 
         except ConvergenceWarning as e:
             pass
-        print(attribute, cohen_kappa_score(preds, s.ATTRIBUTE_MODEL.df[attribute]))
\ No newline at end of file
+        except ValueError as e:
+            # e.g. a single class of the attribute left in the filtered rows
+            print(f"ERROR: cannot align {attribute}: {e}")
+            continue
+        print(attribute, cohen_kappa_score(preds, y))
+
+    if args.get('folds', 0) > 1:
+        if args['method'] == CorrelationMethod.LOG_REG:
+            compute_cross_validated_scores(method=args['method'], folds=args['folds'], seed=args.get('seed'), X=X)
+        else:
+            print("Cross-validated scores are only available for logistic regression.")
+
+    if args.get('permutations', 0) > 0:
+        if args['method'] in CORRELATION_METHODS:
+            compute_alignment_significance(n_permutations=args['permutations'], seed=args.get('seed'), X=X)
+        else:
+            print("Permutation significance is only available for correlation methods.")
+
+def attribute_state(attribute):
+    # Initial ATTRIBUTE_CHECKLIST_STATE entry of an attribute
+    state = {'checked': True, 'threshold': s.DEFAULT_PROBE_THRESHOLD, 'visible': True}
+
+    # Get class values (recorded once by the loader)
+    if attribute not in s.ATTRIBUTE_COLUMN_INFO:
+        s.ATTRIBUTE_COLUMN_INFO[attribute] = column_info(s.ATTRIBUTE_MODEL.df[attribute])
+    classes = s.ATTRIBUTE_COLUMN_INFO[attribute]['classes'] or []
+    if len(classes) <= 1:
+        state['classes'] = ['n/a']
+        state['checked'] = False
+    else:
+        state['classes'] = classes
+
+    if len(classes) == 2 and any([str(classes[0]) == "0" and str(classes[1]) == "1",
+                                 str(classes[0]).lower() == 'false' and str(classes[1]).lower() == 'true',
+                                 str(classes[0]).lower() == 'n' and str(classes[1]).lower() == 'y',
+                                 str(classes[0]).lower() == 'no' and str(classes[1]).lower() == 'yes']):
+        state['corr_class'] = state['classes'][1]
+    else:
+        state['corr_class'] = state['classes'][0]
+    return state
+
+def alignment_values(attribute, n_pathways):
+    # Coefficients of one attribute's corr. class over the pathways; zero if the class was not fit
+    target = s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']
+    clf = s.ATTRIBUTE_ALIGNMENT_CLFS.get(attribute)
+
+    if clf is None or target == "n/a" or class_absent(attribute):
+        return np.zeros(n_pathways)
+    elif clf.coef_.shape[0] > 1:
+        idx = list(clf.classes_).index(target)
+        return clf.coef_[idx]
+    return clf.coef_[0]
+
+def class_absent(attribute):
+    # True if the attribute's corr. class has no rows among those the alignment was fit on, e.g. when the
+    # analysis is restricted to filtered rows or only part of the instances were joined
+    target = s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']
+    clf = s.ATTRIBUTE_ALIGNMENT_CLFS.get(attribute)
+    return clf is not None and target != "n/a" and target not in list(clf.classes_)
+
+def alignment_bars(attribute, n_pathways):
+    # Bar heights, colors and annotation of one attribute
+    target = s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']
+    y = alignment_values(attribute, n_pathways)
+
+    q_values = None if class_absent(attribute) else _alignment_q_values(attribute, target)
+    if q_values is not None:
+        colors = ['blue' if q < s.SIGNIFICANCE_LEVEL else 'grey' for q in q_values]
+    else:
+        colors = ['blue' if np.abs(v) > s.ATTRIBUTE_CHECKLIST_STATE[attribute]['threshold']
+                  else 'grey' for v in y]
+
+    annotation = ""
+    if class_absent(attribute):
+        annotation = f"{target} is absent from the analyzed rows"
+    elif attribute in s.ATTRIBUTE_ALIGNMENT_CV_SCORES:
+        mean, std = s.ATTRIBUTE_ALIGNMENT_CV_SCORES[attribute]
+        annotation = f"CV score: {mean:.3f} ± {std:.3f}"
+    return y, colors, annotation
+
+def _alignment_q_values(attribute, target):
+    if attribute not in s.ATTRIBUTE_ALIGNMENT_PVALUES or target == "n/a":
+        return None
+
+    significance = s.ATTRIBUTE_ALIGNMENT_PVALUES[attribute]
+    idx = list(significance['classes']).index(target)
+    return significance['q_values'][idx]
+
+def join_instances(**args):
+    # Match attribute rows to activation rows, by the instance id column if one is chosen, otherwise by order
+    s.ACTIVATION_ROWS = None
+    s.INSTANCE_JOIN_REPORT = {}
+
+    if s.ACTIVATION_MATRIX is None or len(s.ATTRIBUTE_MODEL.df.columns) == 0:
+        return
+
+    if s.INSTANCE_ID_ATTRIBUTE:
+        if s.ACTIVATION_IDS is None:
+            print("ERROR: the activation file has no instance ids; joining by row order.")
+        else:
+            s.ACTIVATION_ROWS, s.INSTANCE_JOIN_REPORT = align_instances(s.ATTRIBUTE_MODEL.df[s.INSTANCE_ID_ATTRIBUTE],
+                                                                        s.ACTIVATION_IDS)
+    if not s.INSTANCE_JOIN_REPORT:
+        s.ACTIVATION_ROWS, s.INSTANCE_JOIN_REPORT = align_positions(len(s.ATTRIBUTE_MODEL.df.index),
+                                                                    s.ACTIVATION_MATRIX.shape[0])
+
+    report = s.INSTANCE_JOIN_REPORT
+    if report['attributes_only'] or report['activations_only'] or report['duplicate_ids']:
+        print(f"WARNING: {report['matched']} instances matched, {report['attributes_only']} attribute rows without "
+              f"activations, {report['activations_only']} activation rows without attributes, "
+              f"{report['duplicate_ids']} duplicated activation ids.")
+    return report
+
+def alignment_rows():
+    # Attribute rows to analyze: those with activations, narrowed to the attribute query when analysis is
+    # restricted to it. None means every row, with attribute row i matching activation row i.
+    mask = None if s.ACTIVATION_ROWS is None else s.ACTIVATION_ROWS >= 0
+    if s.RESTRICT_TO_QUERY and s.ATTRIBUTE_ROW_MASK is not None:
+        mask = s.ATTRIBUTE_ROW_MASK if mask is None else mask & s.ATTRIBUTE_ROW_MASK
+
+    if mask is None:
+        return None
+    return np.flatnonzero(mask)
+
+def activation_rows(rows):
+    # The activation (and pathway) rows matching the given attribute rows
+    if s.ACTIVATION_ROWS is None:
+        return rows
+    return s.ACTIVATION_ROWS[rows]
+
+def pathway_instances(pathway, n, bottom=False):
+    """
+    The attribute rows with the n highest (or lowest) activations of a pathway, in order, and those
+    activations. Uses PATHWAYS_ORDERINGS when it is ready, so no sorting happens per request.
+    """
+    rows = alignment_rows()
+
+    if s.PATHWAYS_ORDERINGS is not None:
+        order = s.PATHWAYS_ORDERINGS[:, pathway]
+        if bottom:
+            order = order[::-1]
+
+        if rows is None:
+            instances = order[:n]
+        else:
+            # Walk the activation order and keep the rows that belong to analyzed attribute rows
+            inverse = np.full(len(order), -1, dtype=np.int64)
+            inverse[activation_rows(rows)] = rows
+            instances = inverse[order]
+            instances = instances[instances >= 0][:n]
+    else:
+        instances = _top_n(aligned_pathways(rows)[:, pathway], n, bottom)
+        if rows is not None:
+            instances = rows[instances]
+
+    return instances, s.PATHWAYS_ACTIVATIONS[activation_rows(instances), pathway]
+
+def class_instances(pathway, n, attribute, cls, bottom=False):
+    # Like pathway_instances, but only over the rows of one class of the attribute (from its class row index)
+    rows = s.ATTRIBUTE_COLUMN_INFO[attribute]['class_rows'][cls]
+
+    keep = np.ones(len(rows), dtype=bool)
+    if s.ACTIVATION_ROWS is not None:
+        keep &= s.ACTIVATION_ROWS[rows] >= 0
+    if s.RESTRICT_TO_QUERY and s.ATTRIBUTE_ROW_MASK is not None:
+        keep &= s.ATTRIBUTE_ROW_MASK[rows]
+    rows = rows[keep]
+
+    values = s.PATHWAYS_ACTIVATIONS[activation_rows(rows), pathway]
+    instances = _top_n(values, n, bottom)
+    return rows[instances], values[instances]
+
+def stratified_instances(pathway, n, attribute, bottom=False):
+    # The top (or bottom) n of every class of the attribute, one class after another
+    parts = [class_instances(pathway, n, attribute, cls, bottom)
+             for cls in s.ATTRIBUTE_COLUMN_INFO[attribute]['classes']]
+    return np.concatenate([rows for rows, _ in parts]), np.concatenate([values for _, values in parts])
+
+def _top_n(values, n, bottom=False):
+    # Positions of the n largest (or smallest) values, in order
+    n = min(n, len(values))
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    values = -values if bottom else values
+    ind = np.argpartition(values, -n)[-n:]
+    return ind[np.argsort(values[ind])][::-1]
+
+def nearest_instances(row, k):
+    """
+    The k analyzed attribute rows nearest to attribute row `row` in pathway space, and their distances,
+    or None while PATHWAYS_NEIGHBOR_INDEX is still being built.
+    """
+    index = s.PATHWAYS_NEIGHBOR_INDEX
+    if index is None:
+        print("The neighbor index is still being built.")
+        return None
+
+    source = row if s.ACTIVATION_ROWS is None else int(s.ACTIVATION_ROWS[row])
+    rows = alignment_rows()
+    if rows is None:
+        return index.query(source, k)
+
+    # The index covers every activation row, so ask for more neighbors until k of them are analyzed rows
+    inverse = np.full(index.n_samples, -1, dtype=np.int64)
+    inverse[activation_rows(rows)] = rows
+    n_neighbors = k
+    while True:
+        neighbors, distances = index.query(source, n_neighbors)
+        instances = inverse[neighbors]
+        keep = instances >= 0
+        if np.count_nonzero(keep) >= k or n_neighbors >= index.n_samples - 1:
+            return instances[keep][:k], distances[keep][:k]
+        n_neighbors *= 4
+
+def attribute_values(attribute, rows=None):
+    values = s.ATTRIBUTE_MODEL.df[attribute]
+    return values if rows is None else values.iloc[rows]
+
+def aligned_pathways(rows=None):
+    # Pathway activations of the given attribute rows; only those rows are gathered, the full matrix is never copied
+    return s.PATHWAYS_ACTIVATIONS if rows is None else s.PATHWAYS_ACTIVATIONS[activation_rows(rows)]
+
+def pathway_histogram(pathway, bins=50):
+    # Distribution of one pathway's activations over the analyzed rows
+    rows = alignment_rows()
+    values = s.PATHWAYS_ACTIVATIONS[:, pathway] if rows is None else s.PATHWAYS_ACTIVATIONS[activation_rows(rows), pathway]
+    return np.histogram(values, bins=bins)
+
+def projection_points(x_pathway, y_pathway, attribute=None):
+    """
+    The analyzed attribute rows, their activations on two pathways, and a class code per row for the given
+    attribute together with its classes. Attributes without classes put every row in a single class.
+    """
+    rows = alignment_rows()
+    activations = slice(None) if rows is None else activation_rows(rows)
+    x = s.PATHWAYS_ACTIVATIONS[activations, x_pathway]
+    y = s.PATHWAYS_ACTIVATIONS[activations, y_pathway]
+    if rows is None:
+        rows = np.arange(len(x))
+
+    info = s.ATTRIBUTE_COLUMN_INFO.get(attribute)
+    if info is None or info['class_rows'] is None:
+        return rows, x, y, np.zeros(len(rows), dtype=np.int64), ["<All Instances>"]
+
+    classes = list(info['classes'])
+    codes = np.full(len(s.ATTRIBUTE_MODEL.df), len(classes), dtype=np.int64)
+    for k, cls in enumerate(classes):
+        codes[info['class_rows'][cls]] = k
+    codes = codes[rows]
+
+    # Rows without a value get a class of their own
+    if np.any(codes == len(classes)):
+        classes.append("<Missing>")
+    return rows, x, y, codes, classes
+
+def _alignment_inputs(method, rows=None):
+    X = aligned_pathways(rows)
+
+    # Rank-based methods rank the pathways once here and reuse the ranks for every attribute
+    if method in (CorrelationMethod.SPEARMAN, CorrelationMethod.MUTUAL_INFO):
+        return rank_transform(X)
+    return X
+
+def _make_classifier(method):
+    if method == CorrelationMethod.LOG_REG:
+        return LogisticRegression()
+    elif method == CorrelationMethod.ANOVA_F:
+        return AnovaFClassifier()
+    elif method == CorrelationMethod.MUTUAL_INFO:
+        return MutualInformationClassifier(ranked=True)
+    else:
+        # Spearman is Pearson on the ranked pathways
+        return PearsonCorrelationClassifier()
+
+def _score_fold(X, labels, method, train, test):
+    # Fit on the same inputs and classifier as the displayed model, so the score is that model's accuracy
+    scores = {}
+    for attribute, y in labels.items():
+        clf = _make_classifier(method)
+        try:
+            clf.fit(X[train], y[train])
+            scores[attribute] = clf.score(X[test], y[test])
+        except ValueError:
+            # e.g. only one class of the attribute present in the training fold
+            scores[attribute] = np.nan
+    return scores
+
+def compute_cross_validated_scores(**args):
+    # k-fold held-out accuracy of logistic regression, with the folds fit in parallel; stores (mean, std) per
+    # attribute. The other methods do not predict classes, so they have no accuracy to score.
+    s.ATTRIBUTE_ALIGNMENT_CV_SCORES = {}
+    if args['method'] != CorrelationMethod.LOG_REG:
+        return
+
+    rows = alignment_rows()
+    labels = OrderedDict((a, np.asarray(attribute_values(a, rows)))
+                         for a, state in s.ATTRIBUTE_CHECKLIST_STATE.items()
+                         if state['checked'] and state['classes'] != ['n/a'])
+    if s.PATHWAYS_ACTIVATIONS is None or len(labels) == 0:
+        return
+
+    X = args['X'] if 'X' in args else _alignment_inputs(args['method'], rows)
+    folds = KFold(n_splits=args['folds'], shuffle=True, random_state=args.get('seed'))
+
+    # Threads let every fold read the same activation matrix without copying it to worker processes
+    fold_scores = Parallel(n_jobs=args.get('n_jobs', args['folds']), prefer='threads')(
+        delayed(_score_fold)(X, labels, args['method'], train, test) for train, test in folds.split(X))
+
+    for attribute in labels:
+        scores = np.array([fold[attribute] for fold in fold_scores])
+        s.ATTRIBUTE_ALIGNMENT_CV_SCORES[attribute] = (np.nanmean(scores), np.nanstd(scores))
+
+def compute_alignment_significance(**args):
+    # Permutation test of every (attribute class, pathway) correlation, FDR-corrected across the whole grid
+    s.ATTRIBUTE_ALIGNMENT_PVALUES = {}
+
+    attributes = [a for a, state in s.ATTRIBUTE_CHECKLIST_STATE.items()
+                  if state['checked'] and state['classes'] != ['n/a']]
+    if s.PATHWAYS_ACTIVATIONS is None or len(attributes) == 0:
+        return
+
+    # Stack the class indicators of every attribute so all of them share each batch of permutations
+    rows = alignment_rows()
+    indicators = [indicator_matrix(attribute_values(a, rows), s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'],
+                                   dtype=np.float32)
+                  for a in attributes]
+    X = args['X'] if 'X' in args else _alignment_inputs(CorrelationMethod.PEARSON, rows)
+    p_values = permutation_pvalues(X, np.concatenate(indicators, axis=1),
+                                   n_permutations=args['n_permutations'], seed=args.get('seed')).T
+    q_values = fdr_bh(p_values)
+
+    start = 0
+    for attribute, ind in zip(attributes, indicators):
+        end = start + ind.shape[1]
+        s.ATTRIBUTE_ALIGNMENT_PVALUES[attribute] = {'classes': s.ATTRIBUTE_CHECKLIST_STATE[attribute]['classes'],
+                                                    'p_values': p_values[start:end],
+                                                    'q_values': q_values[start:end]}
+        start = end
+
+def scan_neurons(**args):
+    # Rank the raw neurons of ACTIVATION_MATRIX by their correlation with each checked attribute's chosen class
+    s.NEURON_SCAN_RESULTS = OrderedDict()
+
+    if s.ACTIVATION_MATRIX is None:
+        print("ERROR: activations must be loaded.")
+        return
+
+    targets = [(a, state['corr_class']) for a, state in s.ATTRIBUTE_CHECKLIST_STATE.items()
+               if state['checked'] and state['corr_class'] != 'n/a']
+    if len(targets) == 0:
+        return
+
+    rows = alignment_rows()
+    Y = np.concatenate([indicator_matrix(attribute_values(a, rows), [cls], dtype=np.float32)
+                        for a, cls in targets], axis=1)
+    indices, correlations = top_correlated_columns(s.ACTIVATION_MATRIX, Y, top_n=args.get('top_n', 20),
+                                                   memory_budget=args.get('memory_budget',
+                                                                          s.NEURON_SCAN_MEMORY_BUDGET),
+                                                   rows=activation_rows(rows))
+
+    for (attribute, cls), idxs, rs in zip(targets, indices, correlations):
+        neurons = []
+        layers = OrderedDict()
+        for idx, r in zip(idxs, rs):
+            name = s.ACTIVATION_NEURONS[idx]
+            layer = name.rsplit(':', 1)[0]
+            neurons.append((name, layer, float(r)))
+            layers[layer] = layers.get(layer, 0) + 1
+
+        s.NEURON_SCAN_RESULTS[attribute] = {'class': cls, 'neurons': neurons, 'layers': layers}
+
+    return s.NEURON_SCAN_RESULTS
+
+def search_conjunctions(**args):
+    # Pathway alignments of pairwise "attribute_a = x AND attribute_b = y" conjunctions of the checked attributes
+    s.CONJUNCTION_RESULTS = []
+    s.CONJUNCTION_SEARCH_STATS = {}
+
+    if s.PATHWAYS_ACTIVATIONS is None:
+        print("ERROR: pathways must be extracted.")
+        return
+
+    attributes = [a for a, state in s.ATTRIBUTE_CHECKLIST_STATE.items()
+                  if state['checked'] and state['classes'] != ['n/a']]
+    labels = [(a, cls) for a in attributes for cls in s.ATTRIBUTE_CHECKLIST_STATE[a]['classes']]
+    if len(attributes) < 2:
+        return s.CONJUNCTION_RESULTS
+
+    rows = alignment_rows()
+    indicators = np.concatenate([indicator_matrix(attribute_values(a, rows), s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'],
+                                                  dtype=bool)
+                                 for a in attributes], axis=1)
+    groups = [a for a, _ in labels]
+
+    X = aligned_pathways(rows)
+    results, s.CONJUNCTION_SEARCH_STATS = conjunction_search(X, indicators, groups,
+                                                             top_k=args.get('top_k', 20),
+                                                             min_support=args.get('min_support',
+                                                                                  s.DEFAULT_CONJUNCTION_SUPPORT))
+
+    s.CONJUNCTION_RESULTS = [{'conjunction': (labels[i], labels[j]),
+                              'pathway': pathway,
+                              'correlation': r,
+                              'support': support}
+                             for i, j, pathway, r, support in results]
+    return s.CONJUNCTION_RESULTS
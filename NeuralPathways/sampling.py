@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import warnings
+import zlib
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from joblib import Parallel, delayed, effective_n_jobs
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DEFAULT_CHUNK_SIZE = 1000000
+
+
+class AncestralSampler:
+    """
+    Vectorized forward sampler for a discrete Bayesian network of TabularCPDs.
+
+    The CPDs are compiled once into cumulative probability tables with one row per combination of parent
+    states, in topological order. Sampling a node then draws all of its samples at once: the parents' states
+    index a table row (row-major over the CPD's evidence, as TabularCPD lays its columns out) and one uniform
+    draw per sample is compared against that row. Each node has its own random stream, derived from the seed
+    and the node's name, so a node's samples do not change when unrelated nodes are added or removed.
+    """
+
+    def __init__(self, model):
+        self.nodes = []
+        cpds = {cpd.variable: cpd for cpd in model.get_cpds()}
+
+        for node in nx.lexicographical_topological_sort(model, key=str):
+            if node not in cpds:
+                raise ValueError(f"{node} has no probability table.")
+            cpd = cpds[node]
+
+            parents = list(cpd.variables[1:])
+            cardinality = [int(c) for c in cpd.cardinality]
+            values = cpd.get_values().reshape(cardinality[0], -1)
+
+            # Upper bound of every state but the last, per parent combination: (combinations, states - 1)
+            thresholds = np.cumsum(values, axis=0)[:-1].T.copy()
+            self.nodes.append((node, parents, cardinality[1:], thresholds, cpd.state_names[node]))
+
+    def sample(self, n_samples, seed=None, chunk=0):
+        """
+        A DataFrame of n_samples joint samples, one column per node in sorted order, holding state names.
+        Chunks of a larger sample use their own streams, so the same seed never repeats samples across chunks.
+        """
+        entropy = np.random.SeedSequence(seed).entropy
+        codes = {}
+
+        for node, parents, parent_cards, thresholds, state_names in self.nodes:
+            key = (zlib.crc32(str(node).encode()), chunk)
+            rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=key))
+
+            # Table row of every sample, from its parents' states
+            row = 0
+            if parents:
+                row = np.zeros(n_samples, dtype=np.intp)
+                for parent, card in zip(parents, parent_cards):
+                    row *= card
+                    row += codes[parent]
+
+            u = rng.random(n_samples)
+            states = np.zeros(n_samples, dtype=np.uint8 if len(state_names) <= 256 else np.int64)
+            for k in range(thresholds.shape[1]):
+                states += u >= thresholds[row, k]
+            codes[node] = states
+
+        return pd.DataFrame({node: self._states(codes[node], state_names)
+                             for node, _, _, _, state_names in sorted(self.nodes, key=lambda n: str(n[0]))})
+
+    @staticmethod
+    def _states(codes, state_names):
+        # Default state names are the state indices themselves, so the codes can be used as they are; named
+        # states keep the codes too, as a categorical
+        if list(state_names) == list(range(len(state_names))):
+            return codes
+        return pd.Categorical.from_codes(codes, categories=state_names)
+
+
+def write_samples(sampler, file_name, n_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, n_jobs=1, progress=None,
+                  cancelled=None):
+    """
+    Sample n_samples rows chunk by chunk and append every chunk to file_name, a .parquet file (one row group
+    per chunk) or a CSV file, so memory use depends on chunk_size only. Returns the number of rows written,
+    or None if cancelled. The file holds the rows written up to a cancellation.
+
+    With n_jobs other than 1, chunks are sampled by a pool of worker processes, each writing its chunk to a
+    shard file that is merged into file_name in chunk order. A chunk's samples depend on the seed and the
+    chunk's index only, so the file is the same for any number of workers.
+    """
+    parquet = file_name.endswith('.parquet')
+    if parquet and pa is None:
+        raise ValueError("Writing Parquet files needs pyarrow.")
+
+    # Draw the seed once so every chunk comes from the same sequence
+    seed = np.random.SeedSequence(seed).entropy
+    sizes = [min(chunk_size, n_samples - start) for start in range(0, n_samples, chunk_size)]
+
+    shard_dir = None
+    if effective_n_jobs(n_jobs) == 1:
+        shards = (_sample_chunk(sampler, size, seed, chunk, parquet) for chunk, size in enumerate(sizes))
+    else:
+        # Shards go next to the output, on the same disk; the pool only runs a few chunks ahead of the merge
+        shard_dir = tempfile.mkdtemp(prefix='.shards-', dir=os.path.dirname(os.path.abspath(file_name)))
+        shards = Parallel(n_jobs=n_jobs, return_as='generator')(
+            delayed(_write_shard)(sampler, os.path.join(shard_dir, str(chunk)), size, seed, chunk, parquet)
+            for chunk, size in enumerate(sizes))
+
+    written = 0
+    writer = None
+    try:
+        with open(file_name, 'wb') as file:
+            try:
+                for size, shard in zip(sizes, shards):
+                    if cancelled is not None and cancelled():
+                        return None
+
+                    if shard_dir is not None:
+                        shard = _read_shard(shard, parquet)
+                    if parquet:
+                        if writer is None:
+                            writer = pq.ParquetWriter(file, shard.schema)
+                        writer.write_table(shard)
+                    else:
+                        file.write(shard)
+
+                    written += size
+                    if progress is not None:
+                        progress(int(100 * written / n_samples))
+            finally:
+                if writer is not None:
+                    writer.close()
+    finally:
+        if shard_dir is not None:
+            # Stops the pool when cancelled part way; joblib warns about the chunks it drops
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                shards.close()
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    return written
+
+
+def _sample_chunk(sampler, n_samples, seed, chunk, parquet):
+    # A chunk as a Parquet table, or as CSV bytes with the header on the first chunk only
+    df = sampler.sample(n_samples, seed=seed, chunk=chunk)
+    if parquet:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return _csv_bytes(df, header=chunk == 0)
+
+
+def _write_shard(sampler, path, n_samples, seed, chunk, parquet):
+    # Runs in a worker process
+    shard = _sample_chunk(sampler, n_samples, seed, chunk, parquet)
+    if parquet:
+        pq.write_table(shard, path)
+    else:
+        with open(path, 'wb') as file:
+            file.write(shard)
+    return path
+
+
+def _read_shard(path, parquet):
+    if parquet:
+        shard = pq.read_table(path)
+    else:
+        with open(path, 'rb') as file:
+            shard = file.read()
+    os.remove(path)
+    return shard
+
+
+def _csv_bytes(df, header=True):
+    # Single digit states (all binary variables) are laid out as ASCII directly, which is far faster than to_csv
+    codes = [df[c].to_numpy() for c in df.columns]
+    if not all(c.dtype == np.uint8 and (len(c) == 0 or c.max() < 10) for c in codes):
+        return df.to_csv(index=False, header=header).encode()
+
+    text = np.full((len(df), 2 * len(codes)), ord(','), dtype=np.uint8)
+    for k, c in enumerate(codes):
+        text[:, 2 * k] = c + ord('0')
+    text[:, -1] = ord('\n')
+
+    head = (",".join(str(c) for c in df.columns) + "\n").encode() if header else b""
+    return head + text.tobytes()
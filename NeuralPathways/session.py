@@ -5,19 +5,34 @@ from NeuralPathways.models.json_model import JsonModel
 from NeuralPathways.utilities import SignalBridge
 
 sig_attribute_loaded = SignalBridge()
+sig_attributes_added = SignalBridge()
 
 ATTRIBUTE_MODEL = PandasModel()
+ATTRIBUTE_COLUMN_INFO = {}
+ATTRIBUTE_ROW_MASK = None
+RESTRICT_TO_QUERY = False
 
 ACTIVATION_MODEL = PandasModel()
 ACTIVATION_DICT = {}
 ACTIVATION_MATRIX = None
 ACTIVATION_NEURONS = []
+ACTIVATION_IDS = None
+
+# Attribute column holding the instance ids of the activation JSON ("" joins the two by row order)
+INSTANCE_ID_ATTRIBUTE = ""
+# ACTIVATION_ROWS[i] is the activation row of attribute row i (-1 if it has none); None when they line up
+ACTIVATION_ROWS = None
+INSTANCE_JOIN_REPORT = {}
 
 TOTAL_EXPLAINED_VARIANCE = 0.75
 DIMENSIONALITY_REDUCTION = "PCA"
 
 PATHWAYS_MODEL = None
 PATHWAYS_ACTIVATIONS = None
+# Descending row order of every pathway, computed in the background after extraction
+PATHWAYS_ORDERINGS = None
+# NeighborIndex over the pathway activations, also built in the background after extraction
+PATHWAYS_NEIGHBOR_INDEX = None
 PATHWAYS_INFO_MODEL = PandasModel()
 
 ATTRIBUTE_CHECKLIST_STATE = OrderedDict()
@@ -27,6 +42,17 @@ GOLD_LABEL_ATTRIBUTE = ""
 PRED_LABEL_ATTRIBUTE = ""
 ATTRIBUTE_ALIGNMENT_CLFS = {}
 ATTRIBUTE_ALIGNMENT_SCORES = {}
+ATTRIBUTE_ALIGNMENT_PVALUES = {}
+ATTRIBUTE_ALIGNMENT_CV_SCORES = {}
+DEFAULT_PERMUTATIONS = 1000
+SIGNIFICANCE_LEVEL = 0.05
+
+NEURON_SCAN_RESULTS = OrderedDict()
+NEURON_SCAN_MEMORY_BUDGET = 512 * 2 ** 20
+
+CONJUNCTION_RESULTS = []
+CONJUNCTION_SEARCH_STATS = {}
+DEFAULT_CONJUNCTION_SUPPORT = 30
 
 CAUSAL_GRAPH_INITIALIZER = None
 CAUSAL_GRAPH_DEFINITION = None
@@ -0,0 +1,380 @@
+import numpy as np
+import pandas as pd
+
+from scipy import stats
+
+
+def standardize(X, dtype=np.float64):
+    X = np.asarray(X, dtype=dtype)
+    if X.ndim == 1:
+        X = X[:, None]
+
+    std = X.std(axis=0)
+    std[std == 0] = 1
+    return (X - X.mean(axis=0)) / std
+
+
+def indicator_matrix(y, classes, dtype=np.float64):
+    # One column per class, 1 where the instance has that class
+    y = np.asarray(y)
+    return (y[:, None] == np.asarray(classes)[None, :]).astype(dtype)
+
+
+def rank_transform(X):
+    # Column-wise average ranks, so Pearson's r on the result is Spearman's rho
+    return stats.rankdata(np.asarray(X), axis=0)
+
+
+def class_sums(X, codes, n_classes):
+    # Per-class column sums in one pass: sort the rows by class once and reduce each contiguous block
+    X = np.asarray(X)
+    counts = np.bincount(codes, minlength=n_classes)
+    sums = np.zeros((n_classes, X.shape[1]))
+
+    present = counts > 0
+    if present.any():
+        order = np.argsort(codes, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+        sums[present] = np.add.reduceat(X[order], starts, axis=0)
+
+    return sums, counts
+
+
+def class_correlations(X, codes, n_classes):
+    # Pearson's r of every column of X with the indicator of every class, shape (n_classes, X cols)
+    Xz = standardize(X)
+    n = Xz.shape[0]
+    sums, counts = class_sums(Xz, codes, n_classes)
+
+    # Xz is centered, so the covariance with an indicator only needs the sum over that class' rows
+    q = counts / n
+    denominator = n * np.sqrt(q * (1 - q))
+    denominator[denominator == 0] = np.inf
+    return sums / denominator[:, None]
+
+
+def correlation_pvalues(r, n):
+    # Two-sided p-values of Pearson's r under the t-distribution with n - 2 degrees of freedom
+    r = np.clip(np.asarray(r, dtype=np.float64), -1, 1)
+    with np.errstate(divide='ignore'):
+        t = r * np.sqrt((n - 2) / np.maximum(1 - r ** 2, 0))
+    return 2 * stats.t.sf(np.abs(t), n - 2)
+
+
+def anova_f(X, codes, n_classes):
+    # One-way ANOVA F-statistic and p-value of every column of X across the classes, each of shape (X cols,)
+    X = np.asarray(X, dtype=np.float64)
+    n = X.shape[0]
+    sums, counts = class_sums(X, codes, n_classes)
+
+    present = counts > 0
+    k = present.sum()
+    if k < 2 or n <= k:
+        return np.zeros(X.shape[1]), np.ones(X.shape[1])
+
+    grand_mean = X.mean(axis=0)
+    means = sums[present] / counts[present, None]
+    ss_between = (counts[present, None] * (means - grand_mean) ** 2).sum(axis=0)
+    ss_within = np.maximum(X.var(axis=0) * n - ss_between, 0)
+
+    df_between, df_within = k - 1, n - k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = (ss_between / df_between) / (ss_within / df_within)
+    f = np.nan_to_num(f, nan=0.0, posinf=np.finfo(np.float64).max)
+    return f, stats.f.sf(f, df_between, df_within)
+
+
+def binned_mutual_information(X, codes, n_classes, n_bins=10, ranked=False):
+    """
+    Mutual information between the quantile-binned columns of X and the indicator of every class,
+    normalized by the entropy of the indicator so it lies in [0, 1]. Shape (n_classes, X cols).
+
+    Pass ranked=True when X already holds column ranks to skip re-ranking it.
+    """
+    X = np.asarray(X) if ranked else rank_transform(X)
+    n, n_cols = X.shape
+
+    # Equal-width bins over the rank range are quantile bins of the original column
+    low = X.min(axis=0)
+    width = np.maximum(X.max(axis=0) - low, np.finfo(np.float64).eps)
+    bins = np.minimum(((X - low) / width * n_bins).astype(np.int64), n_bins - 1)
+
+    # Joint (column, bin, class) counts for every column at once
+    flat = (np.arange(n_cols) * n_bins + bins) * n_classes + np.asarray(codes)[:, None]
+    joint = np.bincount(flat.ravel(), minlength=n_cols * n_bins * n_classes).reshape(n_cols, n_bins, n_classes)
+
+    bin_counts = joint.sum(axis=2, keepdims=True)
+    class_counts = np.bincount(codes, minlength=n_classes).astype(np.float64)
+
+    def _term(cell, marginal):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = cell * n / (bin_counts * marginal)
+            return np.where(cell > 0, cell / n * np.log(np.where(cell > 0, ratio, 1)), 0)
+
+    mi = (_term(joint, class_counts) + _term(bin_counts - joint, n - class_counts)).sum(axis=1)
+
+    q = class_counts / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = -(np.where(q > 0, q * np.log(q), 0) + np.where(q < 1, (1 - q) * np.log(1 - q), 0))
+    entropy[entropy == 0] = np.inf
+    return (mi / entropy).T
+
+
+def pearson_matrix(X, Y):
+    # Pearson's r between every column of X and every column of Y in one product, shape (X cols, Y cols)
+    return standardize(X).T @ standardize(Y) / np.asarray(X).shape[0]
+
+
+def permutation_pvalues(X, Y, n_permutations=1000, seed=None, memory_budget=256 * 2 ** 20):
+    """
+    Empirical two-sided p-values for the correlation of every column of X with every column of Y.
+
+    Rather than refitting once per shuffle, the permuted copies are stacked and the null
+    correlations of a whole batch of permutations are computed with a single matrix product.
+    Returns an array of shape (X cols, Y cols).
+    """
+    Xz = standardize(X, np.float32)
+    Yz = standardize(Y, np.float32)
+    n = Xz.shape[0]
+
+    observed = np.abs(Xz.T @ Yz) / n
+    # Allow for float32 round-off so the identity permutation still counts as an exceedance
+    observed -= 1e-6
+
+    # Permuting the rows of either side gives the same null distribution, so shuffle the narrower one
+    swap = Xz.shape[1] < Yz.shape[1]
+    fixed, shuffled = (Yz.T, Xz) if swap else (Xz.T, Yz)
+
+    batch_size = max(1, int(memory_budget // max(shuffled.nbytes, 1)))
+    rng = np.random.default_rng(seed)
+    exceed = np.zeros(observed.shape, dtype=np.int64)
+
+    done = 0
+    while done < n_permutations:
+        b = min(batch_size, n_permutations - done)
+        perms = rng.permuted(np.tile(np.arange(n), (b, 1)), axis=1)
+
+        # (b, n, k) stack of shuffled copies -> (b, fixed cols, k) null correlations
+        null = np.abs(np.matmul(fixed, shuffled[perms])) / n
+        if swap:
+            null = null.transpose(0, 2, 1)
+        exceed += (null >= observed).sum(axis=0)
+
+        done += b
+
+    return (exceed + 1) / (n_permutations + 1)
+
+
+def top_correlated_columns(X, Y, top_n=20, memory_budget=256 * 2 ** 20, rows=None):
+    """
+    The top_n columns of X with the largest |r| against each column of Y.
+
+    X is scanned in column chunks sized so that each standardized chunk fits in memory_budget bytes,
+    and every chunk is correlated with all of Y in one matrix product, so X can have any number of
+    columns. If rows is given only those rows of X are used (Y must already be restricted to them);
+    they are gathered one chunk at a time, so X is never copied whole.
+    Returns (indices, correlations), both of shape (Y cols, top_n), sorted by descending |r|.
+    """
+    n_cols = X.shape[1]
+    n = X.shape[0] if rows is None else len(rows)
+    Yz = standardize(Y, np.float32)
+    top_n = min(top_n, n_cols)
+
+    chunk_size = max(1, int(memory_budget // (n * np.dtype(np.float32).itemsize)))
+
+    best_idx = np.zeros((0, Yz.shape[1]), dtype=np.int64)
+    best_r = np.zeros((0, Yz.shape[1]), dtype=np.float32)
+    for start in range(0, n_cols, chunk_size):
+        end = min(start + chunk_size, n_cols)
+        chunk = X[:, start:end] if rows is None else X[rows, start:end]
+        r = standardize(chunk, np.float32).T @ Yz / n
+
+        # Merge this chunk's candidates with the running leaders and keep the top_n of each column
+        cand_r = np.concatenate((best_r, r), axis=0)
+        cand_idx = np.concatenate((best_idx, np.broadcast_to(np.arange(start, end)[:, None], r.shape)), axis=0)
+        if cand_r.shape[0] > top_n:
+            keep = np.argpartition(-np.abs(cand_r), top_n - 1, axis=0)[:top_n]
+            cand_r = np.take_along_axis(cand_r, keep, axis=0)
+            cand_idx = np.take_along_axis(cand_idx, keep, axis=0)
+        best_r, best_idx = cand_r, cand_idx
+
+    order = np.argsort(-np.abs(best_r), axis=0)
+    return np.take_along_axis(best_idx, order, axis=0).T, np.take_along_axis(best_r, order, axis=0).T
+
+
+def _top_sum_bound(Z, memory_budget):
+    # best[k - 1] = the largest |sum| of any k values within a single column of Z
+    n, n_cols = Z.shape
+    best = np.zeros(n)
+    columns_per_chunk = max(1, int(memory_budget // max(n * 8, 1)))
+    for start in range(0, n_cols, columns_per_chunk):
+        ordered = np.sort(Z[:, start:start + columns_per_chunk], axis=0).astype(np.float64)
+        top = np.cumsum(ordered[::-1], axis=0).max(axis=1)
+        bottom = -np.cumsum(ordered, axis=0).min(axis=1)
+        best = np.maximum(best, np.maximum(top, bottom))
+    return best
+
+
+def conjunction_search(X, indicators, groups, top_k=20, min_support=30, batch_size=256,
+                       memory_budget=256 * 2 ** 20):
+    """
+    Search pairwise conjunctions (logical AND) of indicator columns for the strongest |r| with any column of X.
+
+    indicators is a boolean (instances, K) matrix and groups gives, for each of its columns, the attribute it
+    came from; only columns of different groups are paired. Pairs whose support is below min_support (or
+    above n - min_support) are dropped. The rest are visited in order of an upper bound on the |r| their
+    conjunction could reach, and the search stops as soon as no remaining pair can beat the current top_k.
+    Returns (results, stats) where results is a list of (i, j, column of X, r, support) sorted by
+    descending |r|.
+    """
+    Xz = standardize(X, np.float32)
+    n, n_cols = Xz.shape
+    indicators = np.asarray(indicators, dtype=bool)
+    groups = np.asarray(groups)
+    n_ind = indicators.shape[1]
+
+    # Support of every pair in one (chunked) product
+    rows_per_chunk = max(1, int(memory_budget // max(n_ind * 4, 1)))
+    supports = np.zeros((n_ind, n_ind), dtype=np.float64)
+    for start in range(0, n, rows_per_chunk):
+        chunk = indicators[start:start + rows_per_chunk].astype(np.float32)
+        supports += chunk.T @ chunk
+    supports = np.rint(supports).astype(np.int64)
+
+    pair_i, pair_j = np.triu_indices(n_ind, k=1)
+    candidates = groups[pair_i] != groups[pair_j]
+    pair_support = supports[pair_i, pair_j]
+    supported = candidates & (pair_support >= max(min_support, 1)) & (pair_support <= n - min_support)
+    stats = {'pairs': int(candidates.sum()), 'pruned_support': int((candidates & ~supported).sum()),
+             'pruned_bound': 0, 'evaluated': 0}
+    pair_i, pair_j, pair_support = pair_i[supported], pair_j[supported], pair_support[supported]
+    if len(pair_support) == 0:
+        return [], stats
+
+    # A conjunction's rows are a subset of each member's rows, so the sum of Xz over them is at most the
+    # sum of its k most extreme values within either member; take the tighter of the two bounds
+    bound_i = np.zeros(len(pair_support))
+    bound_j = np.zeros(len(pair_support))
+    for c in range(n_ind):
+        as_i, as_j = pair_i == c, pair_j == c
+        if not (as_i.any() or as_j.any()):
+            continue
+        best = _top_sum_bound(Xz[indicators[:, c]], memory_budget)
+        bound_i[as_i] = best[pair_support[as_i] - 1]
+        bound_j[as_j] = best[pair_support[as_j] - 1]
+
+    def _scale(k):
+        q = k / n
+        return n * np.sqrt(q * (1 - q))
+
+    # Small slack for float32 round-off so the bound never prunes a pair it shouldn't
+    bounds = np.minimum(bound_i, bound_j) / _scale(pair_support) + 1e-4
+
+    # Evaluate each pair over the rows of its smaller member only
+    owner = np.where(supports[pair_i, pair_i] <= supports[pair_j, pair_j], pair_i, pair_j)
+    other = np.where(owner == pair_i, pair_j, pair_i)
+    owners = np.unique(owner)
+    owner_bounds = np.array([bounds[owner == c].max() for c in owners])
+
+    results = []
+    threshold = -1.0
+    for c, owner_bound in zip(owners[np.argsort(-owner_bounds)], np.sort(owner_bounds)[::-1]):
+        if owner_bound <= threshold:
+            # Owners are visited by their best bound, so no later pair can make the top_k either
+            break
+
+        mine = np.flatnonzero(owner == c)
+        mine = mine[np.argsort(-bounds[mine])]
+        rows = indicators[:, c]
+        Zc = Xz[rows]
+        Ic = indicators[rows]
+
+        for start in range(0, len(mine), batch_size):
+            batch = mine[start:start + batch_size]
+            batch = batch[bounds[batch] > threshold]
+            if len(batch) == 0:
+                break
+
+            r = (Zc.T @ Ic[:, other[batch]].astype(np.float32)) / _scale(pair_support[batch])
+            stats['evaluated'] += len(batch)
+
+            best = np.argmax(np.abs(r), axis=0)
+            best_r = r[best, np.arange(len(batch))]
+            results.extend(zip(pair_i[batch].tolist(), pair_j[batch].tolist(), best.tolist(), best_r.tolist(),
+                               pair_support[batch].tolist()))
+
+            results.sort(key=lambda result: -abs(result[3]))
+            del results[top_k:]
+            if len(results) >= top_k:
+                threshold = abs(results[-1][3])
+
+    stats['pruned_bound'] = len(pair_support) - stats['evaluated']
+    return results, stats
+
+
+def descending_orderings(X):
+    """
+    Row indices of every column of X sorted by descending value, as an (n, columns) array of int32 where it
+    fits. Row order i of column k is X[:, k].argsort()[::-1][i]; reading it backwards gives ascending order.
+    """
+    dtype = np.int32 if X.shape[0] < 2 ** 31 else np.int64
+    orderings = np.empty(X.shape, dtype=dtype)
+    for k in range(X.shape[1]):
+        orderings[:, k] = np.argsort(X[:, k])[::-1]
+    return orderings
+
+
+def bin_indices(values, value_range, bins):
+    # Equal-width bin of every value, -1 outside the range; the upper edge belongs to the last bin
+    low, high = value_range
+    idx = np.floor((values - low) * (bins / (high - low))).astype(np.int64)
+    idx[values == high] = bins - 1
+    idx[(idx < 0) | (idx >= bins)] = -1
+    return idx
+
+
+def binned_class_counts(x, y, codes, n_classes, x_range, y_range, bins):
+    """
+    2-D histograms of the points (x, y) of every class, shape (n_classes, y bins, x bins), from a single
+    bincount over all points. bins is (x bins, y bins); points outside the ranges are not counted.
+    """
+    bx, by = bins
+    ix = bin_indices(x, x_range, bx)
+    iy = bin_indices(y, y_range, by)
+    keep = (ix >= 0) & (iy >= 0)
+    flat = (codes[keep] * by + iy[keep]) * bx + ix[keep]
+    return np.bincount(flat, minlength=n_classes * by * bx).reshape(n_classes, by, bx)
+
+
+def state_counts(series):
+    """
+    The states of a discrete column and how often each occurs, counted with one bincount over its codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, states = series.cat.codes.to_numpy(), series.cat.categories.to_numpy()
+    elif series.dtype.kind in 'ui':
+        codes = series.to_numpy()
+        states = np.arange(codes.max() + 1 if len(codes) else 0)
+    else:
+        codes, states = pd.factorize(series, sort=True)
+
+    # Missing values have code -1 and are left out
+    counts = np.bincount(codes[codes >= 0], minlength=len(states))
+    return states, counts
+
+
+def fdr_bh(p_values):
+    # Benjamini-Hochberg adjusted p-values (q-values), same shape as the input
+    p = np.asarray(p_values, dtype=np.float64)
+    flat = p.ravel()
+    m = flat.size
+    if m == 0:
+        return p.copy()
+
+    order = np.argsort(flat)
+    ranked = flat[order] * m / np.arange(1, m + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+
+    q = np.empty(m)
+    q[order] = np.clip(ranked, 0, 1)
+    return q.reshape(p.shape)
@@ -2,6 +2,8 @@ import json
 import numpy as np
 import pandas as pd
 
+from functools import partial
+
 from qtpy import QtWidgets
 from qtpy.QtCore import Qt
 from qtpy.QtWidgets import QTreeView
@@ -10,6 +12,11 @@ from qtpy.QtGui import QStandardItemModel, QStandardItem
 import NeuralPathways.session as s
 import NeuralPathways.pathways as p
 
+from NeuralPathways.loading import INSTANCE_IDS_KEY, activation_matrix
+from NeuralPathways.neighbors import NeighborIndex
+from NeuralPathways.stats import descending_orderings
+from NeuralPathways.utilities import Worker
+
 class ActivationWidget(QtWidgets.QWidget):
 
     def __init__(self):
@@ -28,6 +35,19 @@ class ActivationWidget(QtWidgets.QWidget):
         self.loadBtn.clicked.connect(self.loadFile)
 
         vLayoutActivations.addLayout(hLayoutLoadFile)
+
+        hLayoutJoin = QtWidgets.QHBoxLayout()
+        hLayoutJoin.addWidget(QtWidgets.QLabel("Instance ID Column:"))
+        self.instanceIdChoiceBox = QtWidgets.QComboBox()
+        self.instanceIdChoiceBox.addItems(['<Row Order>'])
+        self.instanceIdChoiceBox.currentTextChanged.connect(self.chooseInstanceId)
+        hLayoutJoin.addWidget(self.instanceIdChoiceBox)
+        self.joinLbl = QtWidgets.QLabel()
+        hLayoutJoin.addWidget(self.joinLbl, 1)
+        vLayoutActivations.addLayout(hLayoutJoin)
+        s.sig_attribute_loaded.valueUpdated.connect(self.on_attribute_loaded)
+        s.sig_attributes_added.valueUpdated.connect(self.on_attribute_loaded)
+
         self.activationView = QTreeView()
         vLayoutActivations.addWidget(self.activationView)
 
@@ -110,7 +130,9 @@ class ActivationWidget(QtWidgets.QWidget):
         else:
             self.extractionReadyLbl.setText("Ready for extraction.")
         s.ACTIVATION_DICT = document
-        s.ACTIVATION_MATRIX, s.ACTIVATION_NEURONS = self._createActivationMatrix(document)
+        s.ACTIVATION_IDS = document.get(INSTANCE_IDS_KEY)
+        s.ACTIVATION_MATRIX, s.ACTIVATION_NEURONS = activation_matrix(document)
+        self._joinInstances()
         s.ACTIVATION_MODEL = QStandardItemModel(s.ACTIVATION_MATRIX.shape[0], len(s.ACTIVATION_NEURONS))
         s.ACTIVATION_MODEL.clear()
         print(s.ACTIVATION_MATRIX.shape)
@@ -124,30 +146,34 @@ class ActivationWidget(QtWidgets.QWidget):
         self.activationView.setModel(s.ACTIVATION_MODEL)
 
 
-    def _createActivationMatrix(self, d):
-        if d is None:
-            return
-
-        arrs = []
-        column_names = []
-        for k, v in d.items():
-            if len(v) == 0:
-                print('Skipping {} because there are no data instances.'.format(k))
-                continue
-            elif v[0] == 0:
-                print('Skipping {} because there are no neurons.'.format(k))
-                continue
-
-            temp_arr = np.zeros((len(v), len(v[0])))
-            column_names.extend([f"{k}:{n}" for n in range(len(v[0]))])
-            for i, neurons in enumerate(v):
-                for j, activation in enumerate(neurons):
-                    temp_arr[i, j] = activation
-
-            arrs.append(temp_arr)
-
-        return np.concatenate(arrs, axis=1), column_names
-
+    def on_attribute_loaded(self):
+        current = self.instanceIdChoiceBox.currentText()
+        columns = list(s.ATTRIBUTE_MODEL.df.columns)
+
+        self.instanceIdChoiceBox.blockSignals(True)
+        self.instanceIdChoiceBox.clear()
+        self.instanceIdChoiceBox.addItems(['<Row Order>'] + columns)
+        if current in columns:
+            self.instanceIdChoiceBox.setCurrentText(current)
+        elif 'instance_id' in columns:
+            self.instanceIdChoiceBox.setCurrentText('instance_id')
+        self.instanceIdChoiceBox.blockSignals(False)
+        self.chooseInstanceId(self.instanceIdChoiceBox.currentText())
+
+    def chooseInstanceId(self, column):
+        s.INSTANCE_ID_ATTRIBUTE = '' if column == '<Row Order>' else column
+        self._joinInstances()
+
+    def _joinInstances(self):
+        report = p.join_instances()
+        if not report:
+            self.joinLbl.clear()
+        elif report['attributes_only'] or report['activations_only'] or report['duplicate_ids']:
+            self.joinLbl.setText(f"WARNING: {report['matched']} matched, {report['attributes_only']} attribute rows "
+                                 f"and {report['activations_only']} activation rows unmatched, "
+                                 f"{report['duplicate_ids']} duplicate ids.")
+        else:
+            self.joinLbl.setText(f"{report['matched']} instances matched.")
 
     def extractPathways(self):
         if s.ACTIVATION_MATRIX is None:
@@ -164,6 +190,17 @@ class ActivationWidget(QtWidgets.QWidget):
                                         format(num_pathways,
                                                '' if num_pathways == 1 else 's'))
 
+        # Sort every pathway once in the background so the data inspector never has to
+        self.orderingsWorker = Worker(descending_orderings, s.PATHWAYS_ACTIVATIONS)
+        self.orderingsWorker.signals.finished.connect(partial(self.on_orderings_computed,
+                                                              activations=s.PATHWAYS_ACTIVATIONS))
+        self.orderingsWorker.start()
+
+        self.neighborsWorker = Worker(NeighborIndex, s.PATHWAYS_ACTIVATIONS)
+        self.neighborsWorker.signals.finished.connect(partial(self.on_neighbor_index_built,
+                                                              activations=s.PATHWAYS_ACTIVATIONS))
+        self.neighborsWorker.start()
+
 
         self.pathwaysInfoModel.clear()
 
@@ -183,6 +220,15 @@ class ActivationWidget(QtWidgets.QWidget):
 
 
 
+    def on_orderings_computed(self, orderings, activations):
+        # Ignore results for pathways that have since been re-extracted
+        if activations is s.PATHWAYS_ACTIVATIONS:
+            s.PATHWAYS_ORDERINGS = orderings
+
+    def on_neighbor_index_built(self, index, activations):
+        if activations is s.PATHWAYS_ACTIVATIONS:
+            s.PATHWAYS_NEIGHBOR_INDEX = index
+
     def sliderValueChanged(self):
         self.varianceSelectedLbl.setText("{}%".format(self.varianceSlider.value()))
 
@@ -1,17 +1,20 @@
-import numpy as np
 from collections import OrderedDict
-from functools import partial
 from matplotlib.figure import Figure
-from matplotlib.backend_bases import MouseButton
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
 from qtpy import QtWidgets
-from qtpy.QtCore import Qt
-from qtpy.QtGui import QStandardItemModel, QStandardItem, QFont
+from qtpy.QtCore import Qt, QSortFilterProxyModel
+from qtpy.QtGui import QFont
 
 import NeuralPathways.session as s
 import NeuralPathways.pathways as p
 
-from NeuralPathways.utilities import NavigationToolbar, AlignmentDelegate
+from NeuralPathways.models.checklist_model import AttributeChecklistModel
+from NeuralPathways.models.inspector_model import InspectorModel
+from NeuralPathways.ui.fastplots import FastAlignmentPlot, FAST_PLOTS_AVAILABLE
+from NeuralPathways.ui.plots import AlignmentPlot, HeatmapPlot
+from NeuralPathways.ui.projection import ProjectionDialog
+from NeuralPathways.ui.search import NeuronScanDialog, ConjunctionSearchDialog, NeighborsDialog
+from NeuralPathways.utilities import NavigationToolbar, ClassChoiceDelegate
 
 
 class AnalysisWidget(QtWidgets.QWidget):
@@ -21,6 +24,7 @@ class AnalysisWidget(QtWidgets.QWidget):
 
         sb = bridge
         sb.valueUpdated.connect(self.on_attribute_loaded)
+        s.sig_attributes_added.valueUpdated.connect(self.on_attributes_added)
 
         hLayoutFull = QtWidgets.QHBoxLayout(self)
 
@@ -32,21 +36,40 @@ class AnalysisWidget(QtWidgets.QWidget):
         corrSectionLbl =QtWidgets.QLabel('Attribute Correlation:')
         corrSectionLbl.setFont(boldFont)
 
-        attributes = s.ATTRIBUTE_MODEL.df.columns
-        self.attributesListModel = QStandardItemModel(len(attributes), 4)
-        self.attributesListModel.setHeaderData(0, Qt.Horizontal, "Attributes")
-        self.attributesListModel.setHeaderData(1, Qt.Horizontal, "Threshold")
-        self.attributesListModel.setHeaderData(2, Qt.Horizontal, "Corr. Class")
-        self.attributesListModel.setHeaderData(3, Qt.Horizontal, "Display?")
+        self.attributesListModel = AttributeChecklistModel(self)
+        self.attributesListModel.checkedChanged.connect(self.on_attribute_chk_toggle)
+        self.attributesListModel.thresholdChanged.connect(self.on_attribute_chk_toggle)
+
+        # Filtering happens in the proxy, so the search box never rebuilds the list
+        self.attributesFilterModel = QSortFilterProxyModel(self)
+        self.attributesFilterModel.setSourceModel(self.attributesListModel)
+        self.attributesFilterModel.setFilterKeyColumn(AttributeChecklistModel.ATTRIBUTE)
+        self.attributesFilterModel.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.attributesSearchLE = QtWidgets.QLineEdit()
+        self.attributesSearchLE.setPlaceholderText("Search attributes...")
+        self.attributesSearchLE.setClearButtonEnabled(True)
+        self.attributesSearchLE.textChanged.connect(self.attributesFilterModel.setFilterFixedString)
 
         self.attributesListView = QtWidgets.QTreeView()
-        self.attributesListView.setModel(self.attributesListModel)
+        self.attributesListView.setModel(self.attributesFilterModel)
         self.attributesListView.setAlternatingRowColors(True)
-
-        # TODO: implement Pearson's r option
+        self.attributesListView.setRootIsDecorated(False)
+        self.attributesListView.setUniformRowHeights(True)
+        self.attributesListView.setEditTriggers(QtWidgets.QAbstractItemView.CurrentChanged |
+                                                QtWidgets.QAbstractItemView.DoubleClicked |
+                                                QtWidgets.QAbstractItemView.SelectedClicked)
+        self.classDelegate = ClassChoiceDelegate(AttributeChecklistModel.ClassesRole, self.attributesListView)
+        self.attributesListView.setItemDelegateForColumn(AttributeChecklistModel.CORR_CLASS, self.classDelegate)
+
+        self.corrMethods = OrderedDict([('Logistic Regression', p.CorrelationMethod.LOG_REG),
+                                        ("Pearson's R Value", p.CorrelationMethod.PEARSON),
+                                        ("Spearman's Rank Correlation", p.CorrelationMethod.SPEARMAN),
+                                        ("ANOVA F-Statistic", p.CorrelationMethod.ANOVA_F),
+                                        ("Mutual Information (Binned)", p.CorrelationMethod.MUTUAL_INFO)])
         self.corrMethodLbl = QtWidgets.QLabel("Correlation Method:")
         self.corrMethodChoiceBox = QtWidgets.QComboBox()
-        self.corrMethodChoiceBox.addItems(['Logistic Regression', "Pearson's R Value"])
+        self.corrMethodChoiceBox.addItems(list(self.corrMethods))
         self.corrMethodChoiceBox.setCurrentText("Pearson's R Value")
 
         self.dataColumnLbl = QtWidgets.QLabel("Data Column to Examine:")
@@ -65,30 +88,69 @@ class AnalysisWidget(QtWidgets.QWidget):
 
         pathwayInspectorLbl.setFont(boldFont)
         self.pathwayChoiceLbl = QtWidgets.QLabel("Analyze pathways to enable inspector.")
-        self.pathwaysDataInspectorListModel = QStandardItemModel(len(attributes), 3)
-        self.pathwaysDataInspectorListModel.setHeaderData(0, Qt.Horizontal, "Data")
-        self.pathwaysDataInspectorListModel.setHeaderData(1, Qt.Horizontal, "Attribute Label")
-        self.pathwaysDataInspectorListModel.setHeaderData(2, Qt.Horizontal, "Pathway Activation")
+        self.pathwaysDataInspectorListModel = InspectorModel(parent=self)
 
         self.pathwaysDataInspectorListView = QtWidgets.QTreeView()
         self.pathwaysDataInspectorListView.setModel(self.pathwaysDataInspectorListModel)
         self.pathwaysDataInspectorListView.setAlternatingRowColors(True)
+        self.pathwaysDataInspectorListView.setRootIsDecorated(False)
+        self.pathwaysDataInspectorListView.setUniformRowHeights(True)
+        self.pathwaysDataInspectorListView.setToolTip("Double-click an instance to find similar instances.")
+        self.pathwaysDataInspectorListView.doubleClicked.connect(self.openNeighbors)
 
         hLayoutNInstances = QtWidgets.QHBoxLayout(self)
+        self.instanceOrderChoiceBox = QtWidgets.QComboBox()
+        self.instanceOrderChoiceBox.addItems(["Top", "Bottom"])
         self.topNInstancesSpinbox = QtWidgets.QSpinBox()
-        self.topNInstancesSpinbox.setRange(1, 100)
+        self.topNInstancesSpinbox.setRange(1, 10000000)
         self.topNInstancesSpinbox.setValue(10)
+        self.topNInstancesSpinbox.setKeyboardTracking(False)
 
-        hLayoutNInstances.addWidget(QtWidgets.QLabel("Top N Instances:"))
+        hLayoutNInstances.addWidget(self.instanceOrderChoiceBox)
+        hLayoutNInstances.addWidget(QtWidgets.QLabel("N Instances:"))
         hLayoutNInstances.addWidget(self.topNInstancesSpinbox)
+        self.instanceOrderChoiceBox.currentTextChanged.connect(self._refreshDataInspectorList)
+
+        hLayoutInspectorClass = QtWidgets.QHBoxLayout()
+        self.inspectorClassChoiceBox = QtWidgets.QComboBox()
+        self.inspectorClassChoiceBox.addItems(["<All Classes>"])
+        self.inspectorClasses = []
+        self.inspectorClassChoiceBox.currentIndexChanged.connect(self._refreshDataInspectorList)
+        hLayoutInspectorClass.addWidget(QtWidgets.QLabel("Class:"))
+        hLayoutInspectorClass.addWidget(self.inspectorClassChoiceBox, 1)
+        self.topNInstancesSpinbox.valueChanged.connect(self._refreshDataInspectorList)
 
         hLayoutCorrMethod = QtWidgets.QHBoxLayout(self)
         hLayoutCorrMethod.addWidget(QtWidgets.QLabel('Method'), 1)
         hLayoutCorrMethod.addWidget(self.corrMethodChoiceBox, 4)
 
+        hLayoutSignificance = QtWidgets.QHBoxLayout()
+        self.significanceChk = QtWidgets.QCheckBox("Permutation Significance")
+        self.significanceChk.setToolTip("Color bars by FDR-corrected permutation p-value "
+                                        f"(q < {s.SIGNIFICANCE_LEVEL}) instead of the threshold.")
+        self.permutationsSpinbox = QtWidgets.QSpinBox()
+        self.permutationsSpinbox.setRange(100, 100000)
+        self.permutationsSpinbox.setSingleStep(100)
+        self.permutationsSpinbox.setValue(s.DEFAULT_PERMUTATIONS)
+        self.permutationsSpinbox.setSuffix(" perms")
+        hLayoutSignificance.addWidget(self.significanceChk)
+        hLayoutSignificance.addWidget(self.permutationsSpinbox)
+
+        hLayoutFolds = QtWidgets.QHBoxLayout()
+        self.foldsSpinbox = QtWidgets.QSpinBox()
+        self.foldsSpinbox.setRange(1, 20)
+        self.foldsSpinbox.setSpecialValueText("Off")
+        self.foldsSpinbox.setValue(1)
+        self.foldsSpinbox.setToolTip("Score each attribute with k-fold cross-validation (mean ± std); logistic regression only.")
+        hLayoutFolds.addWidget(QtWidgets.QLabel("Cross-Validation Folds:"))
+        hLayoutFolds.addWidget(self.foldsSpinbox)
+
         vLayoutProperties.addWidget(corrSectionLbl)
+        vLayoutProperties.addWidget(self.attributesSearchLE)
         vLayoutProperties.addWidget(self.attributesListView)
         vLayoutProperties.addLayout(hLayoutCorrMethod)
+        vLayoutProperties.addLayout(hLayoutSignificance)
+        vLayoutProperties.addLayout(hLayoutFolds)
         # vLayoutProperties.addWidget(self.goldLabelLbl)
         # vLayoutProperties.addWidget(self.goldLabelChoiceBox)
         # vLayoutProperties.addWidget(self.predLabelLbl)
@@ -99,11 +161,24 @@ class AnalysisWidget(QtWidgets.QWidget):
         vLayoutProperties.addWidget(self.computeBtn)
         self.computeBtn.clicked.connect(self.computePathwayAlignment)
 
+        self.scanNeuronsBtn = QtWidgets.QPushButton("Scan Neurons...", self)
+        vLayoutProperties.addWidget(self.scanNeuronsBtn)
+        self.scanNeuronsBtn.clicked.connect(self.openNeuronScan)
+
+        self.conjunctionsBtn = QtWidgets.QPushButton("Search Conjunctions...", self)
+        vLayoutProperties.addWidget(self.conjunctionsBtn)
+        self.conjunctionsBtn.clicked.connect(self.openConjunctionSearch)
+
+        self.projectionBtn = QtWidgets.QPushButton("Pathway Projection...", self)
+        vLayoutProperties.addWidget(self.projectionBtn)
+        self.projectionBtn.clicked.connect(self.openProjection)
+
         vLayoutProperties.addStretch()
         vLayoutProperties.addWidget(pathwayInspectorLbl)
         vLayoutProperties.addWidget(self.dataColumnLbl)
         vLayoutProperties.addWidget(self.dataColumnChoiceBox)
         vLayoutProperties.addLayout(hLayoutNInstances)
+        vLayoutProperties.addLayout(hLayoutInspectorClass)
         vLayoutProperties.addWidget(self.pathwayChoiceLbl)
         vLayoutProperties.addWidget(self.pathwaysDataInspectorListView)
 
@@ -123,36 +198,83 @@ class AnalysisWidget(QtWidgets.QWidget):
         self.plotScroll = QtWidgets.QScrollArea()
         self.plotView.resize(self.plotScroll.width(), 0)
         self.plotScroll.setWidget(self.plotView)
-
-        vLayoutPlots.addWidget(self.plotToolbar)
-        vLayoutPlots.addWidget(self.plotScroll)
+        self.alignmentPlot = AlignmentPlot(self.plotView, on_select=self.on_bar_select)
+        self.heatmapPlot = HeatmapPlot(self.plotView, on_select=self.on_bar_select, on_hover=self.on_cell_hover)
+
+        # The pyqtgraph bars are only offered when pyqtgraph is installed
+        self.fastPlot = FastAlignmentPlot(on_select=self.on_bar_select) if FAST_PLOTS_AVAILABLE else None
+
+        self.plotStack = QtWidgets.QStackedWidget()
+        self.plotStack.addWidget(self.plotScroll)
+        if self.fastPlot is not None:
+            self.plotStack.addWidget(self.fastPlot)
+
+        self.plotStyleChoiceBox = QtWidgets.QComboBox()
+        self.plotStyleChoiceBox.addItems(["Bars", "Heatmap"] + (["Fast Bars"] if self.fastPlot is not None else []))
+        self.plotStyleChoiceBox.currentTextChanged.connect(self._refreshPlots)
+        self.hoverLbl = QtWidgets.QLabel("")
+
+        hLayoutPlotTools = QtWidgets.QHBoxLayout()
+        hLayoutPlotTools.addWidget(self.plotToolbar)
+        hLayoutPlotTools.addWidget(self.hoverLbl, 1)
+        hLayoutPlotTools.addWidget(QtWidgets.QLabel("View:"))
+        hLayoutPlotTools.addWidget(self.plotStyleChoiceBox)
+
+        vLayoutPlots.addLayout(hLayoutPlotTools)
+        vLayoutPlots.addWidget(self.plotStack)
         hLayoutFull.addLayout(vLayoutPlots, 3)
 
-        # self.plot = pg.MultiPlotWidget()
-        #
-        # y1 = [5, 5, 7, 10, 3, 8, 9, 1, 6, 2]
-        # x = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
-        # self.bargraph = pg.BarGraphItem(x=x, height=y1, width=0.6, brush='g')
-        # self.plot.addItem(self.bargraph)
-        #
-        # hLayoutFull.addWidget(self.plot, 2)
-
-        self.axes = None
         self.inspectionPathway = 0
         self.inspectionAttribute = None
-        self.lastColor = None
-        self.lastSelectedBox = None
+        # True while the inspector shows an explicit list of rows (e.g. a projection cell) rather than a pathway's
+        self.inspectingRows = False
 
     def computePathwayAlignment(self):
-        method = p.CorrelationMethod.PEARSON
-
-        if self.corrMethodChoiceBox.currentText() == "Logistic Regression":
-            method = p.CorrelationMethod.LOG_REG
+        method = self.corrMethods.get(self.corrMethodChoiceBox.currentText(), p.CorrelationMethod.PEARSON)
 
-        p.compute_pathway_alignments(method=method)
+        permutations = self.permutationsSpinbox.value() if self.significanceChk.isChecked() else 0
+        p.compute_pathway_alignments(method=method, permutations=permutations, folds=self.foldsSpinbox.value())
         #print(s.ATTRIBUTE_ALIGNMENT_SCORES)
         self._refreshPlots()
 
+    def openNeuronScan(self):
+        dialog = NeuronScanDialog(self)
+        dialog.show()
+
+    def openConjunctionSearch(self):
+        dialog = ConjunctionSearchDialog(self)
+        dialog.show()
+
+    def openProjection(self):
+        if s.PATHWAYS_ACTIVATIONS is None:
+            self.pathwayChoiceLbl.setText("Please extract pathways first.")
+            return
+        dialog = ProjectionDialog(on_cell_select=self.inspectInstances, parent=self)
+        dialog.show()
+
+    def inspectInstances(self, rows, values, description, attribute=None):
+        # Show a given list of instances, e.g. those of a projection cell, instead of a pathway's top instances
+        data_column = self.dataColumnChoiceBox.currentText()
+        if data_column == '<None Selected>':
+            self.pathwayChoiceLbl.setText('Please select a data column.')
+            return
+
+        # The pathway controls don't apply to these rows until a bar is clicked again
+        self.inspectionAttribute = attribute if attribute is not None else data_column
+        self._refreshInspectorClasses()
+        self.inspectorClassChoiceBox.blockSignals(True)
+        self.inspectorClassChoiceBox.setCurrentIndex(0)
+        self.inspectorClassChoiceBox.blockSignals(False)
+        self._setInspectingRows(True)
+        self.pathwayChoiceLbl.setText(description)
+        self.pathwaysDataInspectorListModel.setInstances(rows, values, s.ATTRIBUTE_MODEL.df[data_column],
+                                                         s.ATTRIBUTE_MODEL.df[self.inspectionAttribute])
+
+    def openNeighbors(self, index):
+        row = self.pathwaysDataInspectorListModel.sourceRow(index.row())
+        dialog = NeighborsDialog(row, self.dataColumnChoiceBox.currentText(), self.inspectionAttribute, self)
+        dialog.show()
+
     def chooseDataColumn(self):
         for a in s.ATTRIBUTE_CHECKLIST_STATE:
             if a == s.PRED_LABEL_ATTRIBUTE:
@@ -190,38 +312,14 @@ class AnalysisWidget(QtWidgets.QWidget):
         self._refreshAttributeList()
         self._refreshPlots()
 
-    def on_attribute_chk_toggle(self, state, chk_box):
-        print(state, chk_box.PATHWAYS_attribute)
-        s.ATTRIBUTE_CHECKLIST_STATE[chk_box.PATHWAYS_attribute]['checked'] = bool(state)
+    def on_attribute_chk_toggle(self, attribute):
+        print(s.ATTRIBUTE_CHECKLIST_STATE[attribute]['checked'], attribute)
         self._refreshPlots()
-    def on_corr_class_select(self, cbox):
-        print(cbox.currentText(), cbox.PATHWAYS_attribute)
-        s.ATTRIBUTE_CHECKLIST_STATE[cbox.PATHWAYS_attribute]['corr_class'] = cbox.currentText()
 
     def on_attribute_loaded(self):
         print("Attributes Loaded")
 
-        s.ATTRIBUTE_CHECKLIST_STATE = OrderedDict((a, {'checked': True,
-                                                       'threshold': s.DEFAULT_PROBE_THRESHOLD,
-                                                       'visible': True})
-                                                  for a in s.ATTRIBUTE_MODEL.df.columns)
-
-        # Get class values ()
-        for a in s.ATTRIBUTE_MODEL.df.columns:
-            classes = sorted(s.ATTRIBUTE_MODEL.df[a].unique())
-            if len(classes) > 50 or len(classes) <= 1:
-                s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'] = ['n/a']
-                s.ATTRIBUTE_CHECKLIST_STATE[a]['checked'] = False
-            else:
-                s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'] = classes
-
-            if len(classes) == 2 and any([str(classes[0]) == "0" and str(classes[1]) == "1",
-                                         str(classes[0]).lower() == 'false' and str(classes[1]).lower() == 'true',
-                                         str(classes[0]).lower() == 'n' and str(classes[1]).lower() == 'y',
-                                         str(classes[0]).lower() == 'no' and str(classes[1]).lower() == 'yes']):
-                s.ATTRIBUTE_CHECKLIST_STATE[a]['corr_class'] = s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'][1]
-            else:
-                s.ATTRIBUTE_CHECKLIST_STATE[a]['corr_class'] = s.ATTRIBUTE_CHECKLIST_STATE[a]['classes'][0]
+        s.ATTRIBUTE_CHECKLIST_STATE = OrderedDict((a, p.attribute_state(a)) for a in s.ATTRIBUTE_MODEL.df.columns)
 
         self.dataColumnChoiceBox.clear()
         self.goldLabelChoiceBox.clear()
@@ -235,180 +333,124 @@ class AnalysisWidget(QtWidgets.QWidget):
         self._refreshAttributeList()
         self._refreshPlots()
 
+    def on_attributes_added(self):
+        # Derived attributes were appended to ATTRIBUTE_MODEL; add the new ones without resetting the others
+        added = [a for a in s.ATTRIBUTE_MODEL.df.columns if a not in s.ATTRIBUTE_CHECKLIST_STATE]
+        for a in added:
+            s.ATTRIBUTE_CHECKLIST_STATE[a] = p.attribute_state(a)
+
+        self.dataColumnChoiceBox.addItems(added)
+        self.goldLabelChoiceBox.addItems(added)
+        self.predLabelChoiceBox.addItems(added)
+        self._refreshAttributeList()
+
     def _refreshAttributeList(self):
-        self.attributesListModel.clear()
+        self.attributesListModel.refresh()
 
-        for attribute, state in s.ATTRIBUTE_CHECKLIST_STATE.items():
-            if attribute == s.GOLD_LABEL_ATTRIBUTE or attribute == s.PRED_LABEL_ATTRIBUTE:
-                continue
-            list_item = QStandardItem(attribute)
-            #list_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-            #list_item.setData(Qt.Checked if state['checked'] else Qt.Unchecked, Qt.CheckStateRole)
-
-            # Set up check mark
-            display_item = QStandardItem()
-            display_checkbox = QtWidgets.QCheckBox()
-            display_checkbox.setChecked(s.ATTRIBUTE_CHECKLIST_STATE[attribute]['checked'])
-            display_checkbox.stateChanged.connect(partial(self.on_attribute_chk_toggle,
-                                                          chk_box=display_checkbox))
-
-            display_checkbox.PATHWAYS_attribute = attribute
-
-            # Set up choice for which class to correlate with
-            corr_class_item = QStandardItem()
-            corr_class_cbox = QtWidgets.QComboBox()
-            corr_class_cbox.addItems([str(cls) for cls in state['classes']])
-            corr_class_cbox.setCurrentText(str(state['corr_class']))
-            corr_class_cbox.currentTextChanged.connect(partial(self.on_corr_class_select,
-                                                               cbox=corr_class_cbox))
-            corr_class_cbox.PATHWAYS_attribute = attribute
-
-            self.attributesListModel.appendRow((list_item,
-                                                QStandardItem(str(state['threshold'])),
-                                                corr_class_item,
-                                                display_item))
-
-            # Register inline widgets
-            self.attributesListView.setIndexWidget(corr_class_item.index(), corr_class_cbox)
-            self.attributesListView.setIndexWidget(display_item.index(), display_checkbox)
-
-        self.attributesListModel.setHeaderData(0, Qt.Horizontal, "Attributes")
-        self.attributesListModel.setHeaderData(1, Qt.Horizontal, "Threshold")
-        self.attributesListModel.setHeaderData(2, Qt.Horizontal, "Corr. Class")
-        self.attributesListModel.setHeaderData(3, Qt.Horizontal, "Display?")
-
-        # # Center Display column (NOT WORKING)
-        # delegate = AlignmentDelegate(self.attributesListView)
-        # self.attributesListView.setItemDelegate(delegate)
-        # delegate.set_column_alignment(3, Qt.AlignCenter)
-
-        self.attributesListView.repaint()
+    def _setInspectingRows(self, inspecting):
+        self.inspectingRows = inspecting
+        for widget in (self.instanceOrderChoiceBox, self.topNInstancesSpinbox, self.inspectorClassChoiceBox):
+            widget.setEnabled(not inspecting)
 
     def _refreshDataInspectorList(self):
-        self.pathwaysDataInspectorListModel.clear()
+        if self.inspectionAttribute is None or self.inspectingRows:
+            return
 
-        pathway_activations = s.PATHWAYS_ACTIVATIONS[:, self.inspectionPathway]
-        # print(pathway_activations)
-        attribute_values = list(s.ATTRIBUTE_MODEL.df[self.inspectionAttribute])
-        # print(attribute_values)
         data_column = self.dataColumnChoiceBox.currentText()
-        # print(data_column)
-
+        bottom = self.instanceOrderChoiceBox.currentText() == "Bottom"
         n = self.topNInstancesSpinbox.value()
-        ind = np.argpartition(pathway_activations, -n)[-n:]
-        top_n_idxs = ind[np.argsort(pathway_activations[ind])][::-1]
-        data_values = list(s.ATTRIBUTE_MODEL.df[data_column][top_n_idxs])
 
-        for idx, d in zip(top_n_idxs, data_values):
-            self.pathwaysDataInspectorListModel.appendRow((QStandardItem(str(d)),
-                                                           QStandardItem(str(attribute_values[idx])),
-                                                           QStandardItem(f"{pathway_activations[idx]:.03f}")))
-
-        self.pathwaysDataInspectorListModel.setHeaderData(0, Qt.Horizontal, "Data")
-        self.pathwaysDataInspectorListModel.setHeaderData(1, Qt.Horizontal, "Attribute Label")
-        self.pathwaysDataInspectorListModel.setHeaderData(2, Qt.Horizontal, "Pathway Activation")
-
-        self.pathwaysDataInspectorListView.repaint()
+        # Choice 0 is every class, 1 is the top N of each class, and the rest are single classes
+        choice = self.inspectorClassChoiceBox.currentIndex()
+        if choice <= 0:
+            rows, activations = p.pathway_instances(self.inspectionPathway, n, bottom)
+        elif choice == 1:
+            rows, activations = p.stratified_instances(self.inspectionPathway, n, self.inspectionAttribute, bottom)
+        else:
+            rows, activations = p.class_instances(self.inspectionPathway, n, self.inspectionAttribute,
+                                                  self.inspectorClasses[choice - 2], bottom)
+
+        self.pathwaysDataInspectorListModel.setInstances(rows, activations,
+                                                         s.ATTRIBUTE_MODEL.df[data_column],
+                                                         s.ATTRIBUTE_MODEL.df[self.inspectionAttribute])
+
+    def _refreshInspectorClasses(self):
+        # Keep the chosen class when it is still one of the inspected attribute's classes
+        current = self.inspectorClassChoiceBox.currentText()
+
+        info = s.ATTRIBUTE_COLUMN_INFO.get(self.inspectionAttribute)
+        self.inspectorClasses = info['classes'] if info is not None and info['class_rows'] is not None else []
+
+        self.inspectorClassChoiceBox.blockSignals(True)
+        self.inspectorClassChoiceBox.clear()
+        self.inspectorClassChoiceBox.addItems(["<All Classes>"])
+        if self.inspectorClasses:
+            self.inspectorClassChoiceBox.addItems(["<N Per Class>"] + [str(cls) for cls in self.inspectorClasses])
+        self.inspectorClassChoiceBox.setCurrentText(current)
+        self.inspectorClassChoiceBox.blockSignals(False)
 
     # def _refreshPlots(self):
     #     pass
 
     def _refreshPlots(self):
-        self.plotFigure.clear()
-        self.plotFigure.suptitle("Attribute/Pathway Alignment")
-
-        self.lastColor = None
-        self.lastSelectedBox = None
         self.pathwaysDataInspectorListModel.clear()
-        self.pathwaysDataInspectorListView.repaint()
+
+        active = self._activePlot()
+        for plot in (self.alignmentPlot, self.heatmapPlot, self.fastPlot):
+            if plot is not None and (plot is not active or s.PATHWAYS_MODEL is None):
+                plot.clear()
+
+        # The matplotlib toolbar only applies to the matplotlib views
+        self.plotStack.setCurrentWidget(self.fastPlot if active is self.fastPlot else self.plotScroll)
+        self.plotToolbar.setVisible(active is not self.fastPlot)
+        self.hoverLbl.setText("")
 
         if s.PATHWAYS_MODEL is None:
             return
 
         self.inspectionPathway = 0
         self.inspectionAttribute = None
+        self._setInspectingRows(False)
         self.pathwayChoiceLbl.setText("Click on a bar to inspect the data that most activates the pathways.")
 
-        x = list(range(s.PATHWAYS_MODEL.n_components_))
-        #y = np.sin(x ** 2)  # TEST DATA
-        # self.plotView.figure.set_figheight(20)
-
         visible_attributes = [a for a, state in s.ATTRIBUTE_CHECKLIST_STATE.items()
                               if state['visible'] and state['checked']]
-        self.axes = self.plotView.figure.subplots(len(visible_attributes), sharex=True, sharey=True)
-
-        if not isinstance(self.axes, np.ndarray):
-            self.axes = [self.axes]
-
-        for i, attribute in enumerate(visible_attributes):
-            self.axes[i].clear()
-
-            if i == 0:
-                self.axes[i].xaxis.set_ticks_position('top')
-                self.axes[i].set_xticks(x,
-                                        labels=['pathway_{}'.format(pw) for pw in x],
-                                        rotation=60,
-                                        ha='left')
-            elif i == len(visible_attributes)-1:
-                self.axes[i].xaxis.set_ticks_position('bottom')
-                self.axes[i].set_xticks(x,
-                                        labels=['pathway_{}'.format(pw) for pw in x],
-                                        rotation=60,
-                                        ha='right')
-            else:
-                self.axes[i].set_xticks(x, labels=['pathway_{}'.format(pw) for pw in x])
-
-            self.axes[i].set_ylabel(attribute)
-
-            target = s.ATTRIBUTE_CHECKLIST_STATE[attribute]['corr_class']
-
-            if len(s.ATTRIBUTE_ALIGNMENT_CLFS) >= 1 and \
-                    s.ATTRIBUTE_ALIGNMENT_CLFS[attribute].coef_.shape[0] > 1 and \
-                    target != "n/a":
-                idx = list(s.ATTRIBUTE_ALIGNMENT_CLFS[attribute].classes_).index(target)
-                y = s.ATTRIBUTE_ALIGNMENT_CLFS[attribute].coef_[idx]
-            elif len(s.ATTRIBUTE_ALIGNMENT_CLFS) >= 1 and \
-                    s.ATTRIBUTE_ALIGNMENT_CLFS[attribute].coef_.shape[0] == 1 and \
-                    target != "n/a":
-                y = s.ATTRIBUTE_ALIGNMENT_CLFS[attribute].coef_[0]
-            else:
-                print('n/a')
-                y = [0] * len(x)
-            self.axes[i].bar(x, y,
-                             color=['blue' if np.abs(v) > s.ATTRIBUTE_CHECKLIST_STATE[attribute]['threshold']
-                                          else 'grey' for v in y],
-                             picker=True)
-            self.axes[i].axhline(0, color='grey', linewidth=0.8)
-            self.axes[i].figure.canvas.mpl_connect('pick_event', self.on_bar_select)
-
-        # self.plotScroll.setFrameRect((self.plotScroll.width(), 1000 * len(self.axes)))
-        self.plotView.resize(self.plotView.get_width_height()[0], 500 + len(self.axes) * 200)
-        self.plotView.draw()
-
-    def on_bar_select(self, event):
-
-        if event.mouseevent.button is MouseButton.LEFT:
-            if self.dataColumnChoiceBox.currentText() == '<None Selected>':
-                self.pathwayChoiceLbl.setText(f'Please select a data column.')
-                return
-
-            ax = event.mouseevent.inaxes
-            attribute = ax.get_ylabel()
-
-            bar = event.artist
-            x = bar.get_x()
-            idx = int(x.round())
-
-            if self.lastSelectedBox:
-                self.lastSelectedBox.set_facecolor(self.lastColor)
-
-            self.lastColor = bar.get_facecolor()
-            self.lastSelectedBox = bar
-            bar.set_facecolor('red')
-
-            self.inspectionPathway = idx
-            self.inspectionAttribute = attribute
-            self.pathwayChoiceLbl.setText(f'Inspecting Pathway {idx} with attribute, "{attribute}"')
-
-            self._refreshDataInspectorList()
-            self.plotView.draw()
+        n_pathways = s.PATHWAYS_MODEL.n_components_
+        width = self.plotView.get_width_height()[0]
+
+        if active is self.heatmapPlot:
+            # One image for the whole grid, sized to the view rather than growing with the attributes
+            self.plotView.resize(width, self.plotScroll.viewport().height())
+            self.heatmapPlot.update(visible_attributes,
+                                    [p.alignment_values(attribute, n_pathways) for attribute in visible_attributes])
+            return
+
+        active.update([(attribute,) + p.alignment_bars(attribute, n_pathways)
+                       for attribute in visible_attributes], n_pathways)
+        if active is self.alignmentPlot:
+            self.plotView.resize(width, 500 + len(visible_attributes) * 200)
+
+    def _activePlot(self):
+        return {"Heatmap": self.heatmapPlot,
+                "Fast Bars": self.fastPlot}.get(self.plotStyleChoiceBox.currentText(), self.alignmentPlot)
+
+    def on_bar_select(self, attribute, idx):
+        if self.dataColumnChoiceBox.currentText() == '<None Selected>':
+            self.pathwayChoiceLbl.setText('Please select a data column.')
+            return
+
+        active = self._activePlot()
+        active.setSelection(attribute, idx)
+        if active is self.fastPlot:
+            self.fastPlot.showHistogram(idx, *p.pathway_histogram(idx))
+
+        self.inspectionPathway = idx
+        self.inspectionAttribute = attribute
+        self._setInspectingRows(False)
+        self.pathwayChoiceLbl.setText(f'Inspecting Pathway {idx} with attribute, "{attribute}"')
+        self._refreshInspectorClasses()
+
+        self._refreshDataInspectorList()
+
+    def on_cell_hover(self, attribute, idx, value):
+        self.hoverLbl.setText(f'Pathway {idx}, "{attribute}": {value:.3f}')
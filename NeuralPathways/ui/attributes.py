@@ -1,11 +1,13 @@
-import pandas as pd
-
 from qtpy import QtWidgets
 
+import numpy as np
+
 import NeuralPathways.session as s
 
+from NeuralPathways.expressions import evaluate_query
+from NeuralPathways.loading import load_attribute_csv
 from NeuralPathways.models.pandas_model import PandasModel
-from NeuralPathways.utilities import SignalBridge
+from NeuralPathways.utilities import SignalBridge, Worker
 
 
 class AttributeWidget(QtWidgets.QWidget):
@@ -14,6 +16,7 @@ class AttributeWidget(QtWidgets.QWidget):
         QtWidgets.QWidget.__init__(self, parent=None)
 
         self.bridge = bridge
+        self.loadWorker = None
 
         vLayout = QtWidgets.QVBoxLayout(self)
         hLayout = QtWidgets.QHBoxLayout()
@@ -21,19 +24,95 @@ class AttributeWidget(QtWidgets.QWidget):
         hLayout.addWidget(self.pathLE)
         self.loadBtn = QtWidgets.QPushButton("Select File", self)
         hLayout.addWidget(self.loadBtn)
+        self.loadProgress = QtWidgets.QProgressBar(self)
+        self.loadProgress.setRange(0, 100)
+        self.loadProgress.setVisible(False)
+        hLayout.addWidget(self.loadProgress)
         vLayout.addLayout(hLayout)
+
+        hLayoutQuery = QtWidgets.QHBoxLayout()
+        self.queryLE = QtWidgets.QLineEdit(self)
+        self.queryLE.setPlaceholderText("Filter rows, e.g. label == 'PER' and len > 20")
+        hLayoutQuery.addWidget(self.queryLE)
+        self.queryBtn = QtWidgets.QPushButton("Apply", self)
+        hLayoutQuery.addWidget(self.queryBtn)
+        self.clearQueryBtn = QtWidgets.QPushButton("Clear", self)
+        hLayoutQuery.addWidget(self.clearQueryBtn)
+        self.restrictChk = QtWidgets.QCheckBox("Restrict analysis to filtered rows", self)
+        self.restrictChk.setChecked(s.RESTRICT_TO_QUERY)
+        hLayoutQuery.addWidget(self.restrictChk)
+        vLayout.addLayout(hLayoutQuery)
+        self.queryLbl = QtWidgets.QLabel(self)
+        vLayout.addWidget(self.queryLbl)
+
         self.pandasTv = QtWidgets.QTableView(self)
         vLayout.addWidget(self.pandasTv)
         self.loadBtn.clicked.connect(self.loadFile)
+        self.queryLE.returnPressed.connect(self.applyQuery)
+        self.queryBtn.clicked.connect(self.applyQuery)
+        self.clearQueryBtn.clicked.connect(self.clearQuery)
+        self.restrictChk.toggled.connect(self.on_restrict_toggled)
         self.pandasTv.setSortingEnabled(True)
 
     def loadFile(self):
         fileName, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open File", "", "CSV Files (*.csv)");
+        if not fileName:
+            return
         self.pathLE.setText(fileName)
+
+        # Parse in the background so large tables don't freeze the window
+        self.loadWorker = Worker(load_attribute_csv, fileName)
+        self.loadWorker.kwargs.update(progress=self.loadWorker.signals.progress.emit)
+        self.loadWorker.signals.progress.connect(self.loadProgress.setValue)
+        self.loadWorker.signals.finished.connect(self.on_file_loaded)
+        self.loadWorker.signals.error.connect(self.on_load_error)
+
+        self.loadBtn.setEnabled(False)
+        self.loadProgress.setValue(0)
+        self.loadProgress.setVisible(True)
+        self.loadWorker.start()
+
+    def applyQuery(self):
+        df = s.ATTRIBUTE_MODEL.df
+        expression = self.queryLE.text().strip()
+        if not expression:
+            self.clearQuery()
+            return
+
         try:
-            df = pd.read_csv(fileName)
-        except FileNotFoundError as e:
+            mask = evaluate_query(df, expression)
+        except ValueError as e:
+            self.queryLbl.setText(f"ERROR: {e}")
+            return
+
+        s.ATTRIBUTE_ROW_MASK = mask
+        s.ATTRIBUTE_MODEL.setRowMask(mask)
+        self.queryLbl.setText(f"{np.count_nonzero(mask)} of {len(df.index)} rows")
+
+    def clearQuery(self):
+        self.queryLE.clear()
+        self.queryLbl.clear()
+        s.ATTRIBUTE_ROW_MASK = None
+        s.ATTRIBUTE_MODEL.setRowMask(None)
+
+    def on_restrict_toggled(self, checked):
+        s.RESTRICT_TO_QUERY = checked
+
+    def on_load_error(self, message):
+        self.loadBtn.setEnabled(True)
+        self.loadProgress.setVisible(False)
+        self.pathLE.setText(f"ERROR: {message}")
+
+    def on_file_loaded(self, result):
+        self.loadBtn.setEnabled(True)
+        self.loadProgress.setVisible(False)
+        if result is None:
             return
+
+        df, info = result
+        s.ATTRIBUTE_COLUMN_INFO = info
+        s.ATTRIBUTE_ROW_MASK = None
+        self.queryLbl.clear()
         s.ATTRIBUTE_MODEL = PandasModel(df)
         self.pandasTv.setModel(s.ATTRIBUTE_MODEL)
         self.bridge.sendSignal()
@@ -1,31 +1,28 @@
-import json
 import matplotlib.pyplot as plt
 import networkx as nx
-import numpy as np
-import pandas as pd
 import qtpynodeeditor as ne
 
-from collections import OrderedDict
-from matplotlib.figure import Figure
+from functools import partial
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
 from qtpy import QtWidgets
 from qtpy.compat import getsavefilename
-from qtpy.QtCore import Qt
 from qtpy.QtGui import QStandardItemModel, QStandardItem
 
-from qtpy.QtWidgets import QTreeView, QHeaderView
-from qtpynodeeditor import Port, PortType
 from qtpynodeeditor.type_converter import TypeConverter
 
 import NeuralPathways.session as s
-import NeuralPathways.pathways as p
 
 from NeuralPathways.models.node_model import (VariableData, VariableListData, variable_to_variable_list_converter,
                                               InitializerDataModel, ObservedExogenousVariableModel,
                                               BinomialExogenousVariableModel,
-                                              VariableInputNodeModel, EndogenousVariableDataModel,
                                               TabularEndogenousVariableDataModel)
-from NeuralPathways.utilities import NavigationToolbar
+from NeuralPathways.sampling import AncestralSampler, write_samples
+from NeuralPathways.stats import state_counts
+from NeuralPathways.utilities import NavigationToolbar, Worker
+
+# Generate keeps the rows in memory; Generate to File streams them, so it can write far more
+MAX_GENERATED_DATA = 10000000
+MAX_STREAMED_DATA = 1000000000
 
 
 class CausalityWidget(QtWidgets.QWidget):
@@ -53,21 +50,26 @@ class CausalityWidget(QtWidgets.QWidget):
 
         # Generated Data Display
 
-        #self.generatedDataTable = QtWidgets.QTableView()
-        generatedData = s.CAUSAL_GENERATED_DATA.df.columns
-        self.generatedDataModel = QStandardItemModel(1, 1)
-        self.generatedDataModel.setHeaderData(0, Qt.Horizontal, "Variables")
-
-        self.generatedDataView = QtWidgets.QTreeView()
-        self.generatedDataView.setModel(self.generatedDataModel)
+        # The table reads the sample columns lazily, so showing it costs the same for any number of rows
+        self.generatedDataView = QtWidgets.QTableView()
+        self.generatedDataView.setModel(s.CAUSAL_GENERATED_DATA)
         self.generatedDataView.setAlternatingRowColors(True)
+        self.generatedDataView.setSortingEnabled(True)
+
+        self.frequencyModel = QStandardItemModel(0, 3)
+        self.frequencyModel.setHorizontalHeaderLabels(["Variable", "Count", "Share"])
+        self.frequencyView = QtWidgets.QTreeView()
+        self.frequencyView.setModel(self.frequencyModel)
+        self.frequencyView.setAlternatingRowColors(True)
+        self.frequencyView.setUniformRowHeights(True)
 
 
         hLayoutNumData = QtWidgets.QHBoxLayout()
         self.numDataToGenerateChoice = QtWidgets.QSpinBox()
-        self.numDataToGenerateChoice.setMaximum(10000)
+        self.numDataToGenerateChoice.setMaximum(MAX_STREAMED_DATA)
         self.numDataToGenerateChoice.setMinimum(100)
         self.numDataToGenerateChoice.setSingleStep(100)
+        self.numDataToGenerateChoice.setGroupSeparatorShown(True)
         self.numDataToGenerateChoice.setValue(1000)
 
         hLayoutNumData.addWidget(QtWidgets.QLabel("# of Data to Generate:"))
@@ -77,12 +79,32 @@ class CausalityWidget(QtWidgets.QWidget):
         self.saveBtn = QtWidgets.QPushButton("Save", self)
         self.saveBtn.clicked.connect(self._save_generated_data)
 
+        hLayoutStream = QtWidgets.QHBoxLayout()
+        self.streamWorker = None
+        self.streamBtn = QtWidgets.QPushButton("Generate to File...", self)
+        self.cancelStreamBtn = QtWidgets.QPushButton("Cancel", self)
+        self.cancelStreamBtn.setEnabled(False)
+        self.streamProgress = QtWidgets.QProgressBar(self)
+        self.streamProgress.setRange(0, 100)
+        self.streamProgress.setVisible(False)
+        hLayoutStream.addWidget(self.streamBtn)
+        hLayoutStream.addWidget(self.cancelStreamBtn)
+        hLayoutStream.addWidget(self.streamProgress)
+        self.streamLbl = QtWidgets.QLabel("")
+        self.streamLbl.setWordWrap(True)
+        self.streamBtn.clicked.connect(self._stream_generated_data)
+        self.cancelStreamBtn.clicked.connect(self._cancel_stream)
+
         vLayoutProperties.addLayout(vLayoutPlots)
         vLayoutProperties.addWidget(QtWidgets.QLabel("Generated Data:"))
         vLayoutProperties.addWidget(self.generatedDataView)
+        vLayoutProperties.addWidget(QtWidgets.QLabel("State Frequencies:"))
+        vLayoutProperties.addWidget(self.frequencyView)
         vLayoutProperties.addLayout(hLayoutNumData)
         vLayoutProperties.addWidget(self.generateBtn)
         vLayoutProperties.addWidget(self.saveBtn)
+        vLayoutProperties.addLayout(hLayoutStream)
+        vLayoutProperties.addWidget(self.streamLbl)
         #vLayoutProperties.addLayout(hLayoutSaveFile)
         vLayoutProperties.addStretch()
 
@@ -117,6 +139,8 @@ class CausalityWidget(QtWidgets.QWidget):
 
 
         scene = ne.FlowScene(registry=registry)
+        # A deleted variable has to leave the compiled graph
+        scene.node_deleted.connect(lambda node: s.CAUSAL_GRAPH_INITIALIZER.mark_stale())
 
         view = ne.FlowView(scene)
         #view.setWindowTitle("Calculator example")
@@ -172,34 +196,91 @@ class CausalityWidget(QtWidgets.QWidget):
             ...
         """
 
-    def _compute_graph(self):
-        # Draw graph
+    def _draw_graph(self):
         self.plotFigure.clf()
         s.CAUSAL_GRAPH_INITIALIZER.reset()
         nx_graph = nx.DiGraph(s.CAUSAL_GRAPH_DEFINITION.edges())
         nx.draw_networkx(nx_graph, with_labels=True)
         self.plotView.draw_idle()
 
+    def _compute_graph(self):
+        self._draw_graph()
+
         # Generate Data
-        generated_df = s.CAUSAL_GRAPH_DEFINITION.simulate(n_samples=self.numDataToGenerateChoice.value())
-        generated_df = generated_df.reindex(sorted(generated_df.columns), axis=1)
+        n_samples = self.numDataToGenerateChoice.value()
+        if n_samples > MAX_GENERATED_DATA:
+            self.streamLbl.setText(f"ERROR: At most {MAX_GENERATED_DATA:,} rows can be kept in memory; "
+                                   f"use Generate to File.")
+            return
+        try:
+            generated_df = AncestralSampler(s.CAUSAL_GRAPH_DEFINITION).sample(n_samples)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return
         s.CAUSAL_GENERATED_DATA.updateDataframe(generated_df)
         print(generated_df)
         self._display_generated_data()
 
     def _display_generated_data(self):
-        print(s.CAUSAL_GENERATED_DATA.columnCount(), s.CAUSAL_GENERATED_DATA.rowCount())
-        self.generatedDataModel = QStandardItemModel(s.CAUSAL_GENERATED_DATA.rowCount(),
-                                                     s.CAUSAL_GENERATED_DATA.columnCount())
-        self.generatedDataModel.clear()
-
-        for i, row in s.CAUSAL_GENERATED_DATA.df.iterrows():
-            self.generatedDataModel.appendRow(tuple([QStandardItem(f"{n}") for n in row]))
-
-        for i, node in enumerate(sorted(s.CAUSAL_GENERATED_DATA.df.columns)):
-            self.generatedDataModel.setHeaderData(i, Qt.Horizontal, node)
-
-        self.generatedDataView.setModel(self.generatedDataModel)
+        df = s.CAUSAL_GENERATED_DATA.df
+        self.frequencyModel.removeRows(0, self.frequencyModel.rowCount())
+        for node in df.columns:
+            states, counts = state_counts(df[node])
+            node_item = QStandardItem(str(node))
+            for state, count in zip(states, counts):
+                node_item.appendRow((QStandardItem(str(state)), QStandardItem(f"{count:,}"),
+                                     QStandardItem(f"{count / max(len(df.index), 1) * 100:.02f}%")))
+            self.frequencyModel.appendRow((node_item, QStandardItem(), QStandardItem()))
+        self.frequencyView.expandAll()
+        self.frequencyView.resizeColumnToContents(0)
+
+    def _stream_generated_data(self):
+        fname, _ = getsavefilename(self, 'Generate to File',
+                                   filters="Comma Separated Values (*.csv);;Parquet (*.parquet)")
+        if not fname:
+            return
+
+        self._draw_graph()
+        try:
+            sampler = AncestralSampler(s.CAUSAL_GRAPH_DEFINITION)
+        except ValueError as e:
+            self.streamLbl.setText(f"ERROR: {e}")
+            return
+
+        # Samples go straight to the file chunk by chunk, sampled on every core; nothing is kept in memory
+        self.streamWorker = Worker(write_samples, sampler, fname, self.numDataToGenerateChoice.value(), n_jobs=-1)
+        self.streamWorker.kwargs.update(progress=self.streamWorker.signals.progress.emit,
+                                        cancelled=self.streamWorker.cancelled)
+        self.streamWorker.signals.progress.connect(self.streamProgress.setValue)
+        self.streamWorker.signals.finished.connect(partial(self.on_stream_finished, fname=fname))
+        self.streamWorker.signals.error.connect(self.on_stream_error)
+
+        self.streamBtn.setEnabled(False)
+        self.cancelStreamBtn.setEnabled(True)
+        self.streamProgress.setValue(0)
+        self.streamProgress.setVisible(True)
+        self.streamLbl.setText(f"PROCESSING: writing to {fname}...")
+        self.streamWorker.start()
+
+    def _cancel_stream(self):
+        if self.streamWorker is not None:
+            self.streamWorker.cancel()
+
+    def on_stream_finished(self, written, fname):
+        self._finish_stream()
+        if written is None:
+            self.streamLbl.setText(f"CANCELLED: {fname} holds the rows written so far.")
+        else:
+            self.streamLbl.setText(f"DONE: {written:,} rows written to {fname}.")
+
+    def on_stream_error(self, message):
+        self._finish_stream()
+        self.streamLbl.setText(f"ERROR: {message}")
+
+    def _finish_stream(self):
+        self.streamBtn.setEnabled(True)
+        self.cancelStreamBtn.setEnabled(False)
+        self.streamProgress.setVisible(False)
 
     def _save_generated_data(self):
         fname, _ = getsavefilename(self, 'Save File', filters="Comma Separated Values (*.csv)")
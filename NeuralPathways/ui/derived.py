@@ -0,0 +1,119 @@
+from qtpy import QtWidgets
+
+import NeuralPathways.session as s
+
+from NeuralPathways.expressions import parse_definitions, evaluate_derived_attributes
+from NeuralPathways.loading import column_info
+from NeuralPathways.utilities import Worker
+
+
+class DerivedAttributeWidget(QtWidgets.QWidget):
+
+    HELP_TEXT = ("One attribute per line as name = expression, in the same syntax as queries: column names "
+                 "(`quoted` or col('name') if they have spaces), and, or, not, &, |, ~ and comparisons, "
+                 "and the helpers bin(col, n or edges), qbin(col, q), "
+                 "match(col, regex), length(col), between(col, low, high), isin(col, [values]) "
+                 "and where(cond, a, b).\n"
+                 "e.g.  long_per = (label == 'PER') & (len > 20)\n"
+                 "      ends_ing = match(text, 'ing$')")
+
+    def __init__(self, bridge, parent=None):
+        QtWidgets.QWidget.__init__(self, parent=None)
+
+        self.worker = None
+        bridge.valueUpdated.connect(self.on_attribute_loaded)
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+
+        helpLbl = QtWidgets.QLabel(self.HELP_TEXT)
+        helpLbl.setWordWrap(True)
+        vLayout.addWidget(helpLbl)
+
+        self.definitionsTE = QtWidgets.QPlainTextEdit(self)
+        vLayout.addWidget(self.definitionsTE)
+
+        hLayout = QtWidgets.QHBoxLayout()
+        self.createBtn = QtWidgets.QPushButton("Create Attributes", self)
+        self.cancelBtn = QtWidgets.QPushButton("Cancel", self)
+        self.cancelBtn.setEnabled(False)
+        self.progressBar = QtWidgets.QProgressBar(self)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.setVisible(False)
+        hLayout.addWidget(self.createBtn)
+        hLayout.addWidget(self.cancelBtn)
+        hLayout.addWidget(self.progressBar)
+        vLayout.addLayout(hLayout)
+
+        self.statusLbl = QtWidgets.QLabel("Load attributes to create derived attributes.")
+        self.statusLbl.setWordWrap(True)
+        vLayout.addWidget(self.statusLbl)
+
+        self.createdList = QtWidgets.QListWidget(self)
+        vLayout.addWidget(self.createdList)
+
+        self.createBtn.clicked.connect(self.createAttributes)
+        self.cancelBtn.clicked.connect(self.cancel)
+
+    def on_attribute_loaded(self):
+        self.createdList.clear()
+        self.statusLbl.setText(f"{len(s.ATTRIBUTE_MODEL.df.columns)} attributes loaded.")
+
+    def createAttributes(self):
+        df = s.ATTRIBUTE_MODEL.df
+        if len(df.columns) == 0:
+            self.statusLbl.setText("ERROR: Need to load attributes.")
+            return
+
+        try:
+            definitions = parse_definitions(self.definitionsTE.toPlainText())
+        except ValueError as e:
+            self.statusLbl.setText(f"ERROR: {e}")
+            return
+        if len(definitions) == 0:
+            return
+
+        # The worker gets its own references to the columns, so adding results to the frame can't race with it
+        columns = {c: df[c] for c in df.columns}
+        self.worker = Worker(evaluate_derived_attributes, columns, definitions)
+        self.worker.kwargs.update(emit=self.worker.signals.result.emit,
+                                  progress=self.worker.signals.progress.emit,
+                                  cancelled=self.worker.cancelled)
+        self.worker.signals.result.connect(self.on_attributes_evaluated)
+        self.worker.signals.progress.connect(self.progressBar.setValue)
+        self.worker.signals.finished.connect(self.on_finished)
+        self.worker.signals.error.connect(self.on_error)
+
+        self.createBtn.setEnabled(False)
+        self.cancelBtn.setEnabled(True)
+        self.progressBar.setValue(0)
+        self.progressBar.setVisible(True)
+        self.statusLbl.setText(f"PROCESSING: evaluating {len(definitions)} attributes...")
+        self.worker.start()
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def on_attributes_evaluated(self, columns):
+        # Called with each finished batch while the rest are still being evaluated
+        for name, values in columns.items():
+            s.ATTRIBUTE_COLUMN_INFO[name] = column_info(values)
+        s.ATTRIBUTE_MODEL.addColumns(columns)
+        self.createdList.addItems(list(columns))
+        s.sig_attributes_added.sendSignal()
+
+    def on_finished(self, errors):
+        self._finish()
+        if errors:
+            self.statusLbl.setText("ERROR: " + "; ".join(f"{name}: {message}" for name, message in errors.items()))
+        else:
+            self.statusLbl.setText("CANCELLED" if self.worker.cancelled() else "DONE")
+
+    def on_error(self, message):
+        self._finish()
+        self.statusLbl.setText(f"ERROR: {message}")
+
+    def _finish(self):
+        self.createBtn.setEnabled(True)
+        self.cancelBtn.setEnabled(False)
+        self.progressBar.setVisible(False)
@@ -0,0 +1,205 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from qtpy import QtWidgets
+from qtpy.compat import getsavefilename
+from qtpy.QtCore import Qt
+
+from NeuralPathways.ui.plots import BAR_WIDTH
+
+try:
+    import pyqtgraph as pg
+    from pyqtgraph import exporters
+except ImportError:
+    pg = None
+
+FAST_PLOTS_AVAILABLE = pg is not None
+
+PLOT_HEIGHT = 150
+
+
+class FastAlignmentPlot(QtWidgets.QWidget):
+    """
+    Alignment bar charts and a pathway activation histogram drawn with pyqtgraph scene items.
+
+    Offers the same update/clear/setSelection interface as AlignmentPlot. Each attribute has one plot whose
+    bars are a BarGraphItem per color, so a redraw paints a handful of batched rectangle lists rather than
+    one item per bar. Dragging pans and the wheel zooms all plots together; Home resets the view and Save
+    exports it.
+    """
+
+    def __init__(self, on_select=None, parent=None):
+        QtWidgets.QWidget.__init__(self, parent)
+        self.on_select = on_select
+
+        self.plots = OrderedDict()
+        self.bars = {}
+        self.heights = {}
+        self.n_pathways = 0
+        self.selection = None
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+        vLayout.setContentsMargins(0, 0, 0, 0)
+
+        hLayoutTools = QtWidgets.QHBoxLayout()
+        self.homeBtn = QtWidgets.QPushButton("Home")
+        self.saveBtn = QtWidgets.QPushButton("Save")
+        hLayoutTools.addWidget(self.homeBtn)
+        hLayoutTools.addWidget(self.saveBtn)
+        hLayoutTools.addStretch()
+        vLayout.addLayout(hLayoutTools)
+
+        self.layoutWidget = pg.GraphicsLayoutWidget()
+        self.layoutWidget.setBackground('w')
+        self.layoutWidget.scene().sigMouseClicked.connect(self._on_click)
+        self.scroll = QtWidgets.QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setWidget(self.layoutWidget)
+
+        self.histogramWidget = pg.PlotWidget(background='w')
+        self.histogramWidget.setLabel('bottom', "Pathway Activation")
+        self.histogramWidget.setLabel('left', "Instances")
+        self.histogramCurve = self.histogramWidget.plot(stepMode='center', fillLevel=0, brush=(0, 0, 255, 80),
+                                                        pen='b')
+
+        splitter = QtWidgets.QSplitter(Qt.Vertical)
+        splitter.addWidget(self.scroll)
+        splitter.addWidget(self.histogramWidget)
+        splitter.setSizes([400, 150])
+        vLayout.addWidget(splitter)
+
+        self.highlight = pg.BarGraphItem(x=[0], height=[0], width=BAR_WIDTH, brush='r', pen=None)
+
+        self.homeBtn.clicked.connect(self.home)
+        self.saveBtn.clicked.connect(self.save)
+
+    def clear(self):
+        self._removeHighlight()
+        self.layoutWidget.clear()
+        self.plots = OrderedDict()
+        self.bars = {}
+        self.heights = {}
+        self.n_pathways = 0
+        self.histogramCurve.setData([], [])
+        self.histogramWidget.setTitle(None)
+
+    def update(self, alignments, n_pathways):
+        """
+        alignments is a list of (attribute, values, colors, annotation), one per displayed attribute, in order.
+        """
+        if n_pathways != self.n_pathways:
+            self.clear()
+            self.n_pathways = n_pathways
+
+        self._removeHighlight()
+        attributes = [attribute for attribute, _, _, _ in alignments]
+        if attributes != list(self.plots):
+            self._layout(attributes)
+
+        x = np.arange(n_pathways)
+        for attribute, values, colors, annotation in alignments:
+            values = np.asarray(values, dtype=float)
+            colors = np.asarray(colors)
+            self.heights[attribute] = values
+
+            plot = self.plots[attribute]
+            for color, item in list(self.bars[attribute].items()):
+                if not np.any(colors == color):
+                    plot.removeItem(item)
+                    del self.bars[attribute][color]
+            for color in np.unique(colors).tolist():
+                mask = colors == color
+                if color not in self.bars[attribute]:
+                    self.bars[attribute][color] = pg.BarGraphItem(x=x[mask], height=values[mask], width=BAR_WIDTH,
+                                                                  brush=color, pen=None)
+                    plot.addItem(self.bars[attribute][color])
+                else:
+                    self.bars[attribute][color].setOpts(x=x[mask], height=values[mask])
+
+            plot.setTitle(annotation or None, size='8pt')
+
+        self.home()
+
+    def _layout(self, attributes):
+        # Stack one plot per attribute; plots of attributes that stay are moved, not rebuilt
+        self.layoutWidget.clear()
+        plots = OrderedDict()
+        for i, attribute in enumerate(attributes):
+            if attribute in self.plots:
+                plot = self.plots[attribute]
+            else:
+                plot = pg.PlotItem()
+                plot.setLabel('left', attribute)
+                plot.addLine(y=0, pen='grey')
+                plot.setMenuEnabled(False)
+                self.bars[attribute] = {}
+            self.layoutWidget.addItem(plot, row=i, col=0)
+            plots[attribute] = plot
+
+        for attribute in self.plots:
+            if attribute not in plots:
+                del self.bars[attribute]
+                self.heights.pop(attribute, None)
+        self.plots = plots
+
+        # All plots share the x and y ranges; only the last one labels the pathways
+        first = next(iter(self.plots.values()), None)
+        for i, plot in enumerate(self.plots.values()):
+            if plot is not first:
+                plot.setXLink(first)
+                plot.setYLink(first)
+            plot.showAxis('bottom', i == len(self.plots) - 1)
+        if first is not None:
+            list(self.plots.values())[-1].setLabel('bottom', "Pathway")
+        self.layoutWidget.setMinimumHeight(PLOT_HEIGHT * len(self.plots))
+
+    def home(self):
+        if not self.plots:
+            return
+        values = np.concatenate(list(self.heights.values()))
+        low, high = min(values.min(), 0), max(values.max(), 0)
+        first = next(iter(self.plots.values()))
+        first.setXRange(-0.5, self.n_pathways - 0.5, padding=0)
+        first.setYRange(low, high, padding=0.05)
+
+    def save(self):
+        filename, _ = getsavefilename(self, "Save Plot", "alignment.png", "Images (*.png *.jpg *.svg)")
+        if not filename:
+            return
+        if filename.endswith('.svg'):
+            exporter = exporters.SVGExporter(self.layoutWidget.scene())
+        else:
+            exporter = exporters.ImageExporter(self.layoutWidget.scene())
+        exporter.export(filename)
+
+    def setSelection(self, attribute, pathway):
+        self._removeHighlight()
+        self.highlight.setOpts(x=[pathway], height=[self.heights[attribute][pathway]])
+        self.plots[attribute].addItem(self.highlight)
+        self.selection = (attribute, pathway)
+
+    def clearSelection(self):
+        self._removeHighlight()
+
+    def _removeHighlight(self):
+        if self.selection is not None and self.selection[0] in self.plots:
+            self.plots[self.selection[0]].removeItem(self.highlight)
+        self.selection = None
+
+    def showHistogram(self, pathway, counts, edges):
+        self.histogramCurve.setData(edges, counts, stepMode='center', fillLevel=0)
+        self.histogramWidget.setTitle(f"Pathway {pathway} Activations", size='9pt')
+
+    def _on_click(self, event):
+        if event.button() != Qt.LeftButton or self.on_select is None:
+            return
+
+        position = event.scenePos()
+        for attribute, plot in self.plots.items():
+            if plot.vb.sceneBoundingRect().contains(position):
+                x = plot.vb.mapSceneToView(position).x()
+                idx = int(round(x))
+                if 0 <= idx < self.n_pathways and abs(x - idx) <= BAR_WIDTH / 2:
+                    self.on_select(attribute, idx)
+                return
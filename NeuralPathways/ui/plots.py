@@ -0,0 +1,360 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from matplotlib.backend_bases import MouseButton
+from matplotlib.collections import PolyCollection
+from matplotlib.gridspec import GridSpec
+from matplotlib.patches import Rectangle
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+BAR_WIDTH = 0.8
+
+
+class AlignmentPlot:
+    """
+    Persistent attribute/pathway alignment bar charts on a matplotlib canvas.
+
+    One axes per attribute is kept between refreshes: update() changes bar heights, colors and annotations in
+    place, and only adds or removes the axes of attributes that appeared or disappeared. Each attribute's bars
+    are a single PolyCollection, which draws far faster than one Rectangle per bar. A single pick handler
+    reports bar clicks through on_select(attribute, pathway), and the selected bar is highlighted by blitting.
+    """
+
+    def __init__(self, canvas, on_select=None):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.on_select = on_select
+
+        self.axes = OrderedDict()
+        self.bars = {}
+        self.heights = {}
+        self.annotations = {}
+        self.n_pathways = 0
+
+        self.highlight = None
+        self.selection = None
+        self.background = None
+
+        self.canvas.mpl_connect('pick_event', self._on_pick)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def clear(self):
+        for attribute in list(self.axes):
+            self._removeAxes(attribute)
+        self.n_pathways = 0
+        self.figure.suptitle("")
+        self.canvas.draw_idle()
+
+    def update(self, alignments, n_pathways):
+        """
+        alignments is a list of (attribute, values, colors, annotation), one per displayed attribute, in order.
+        """
+        if n_pathways != self.n_pathways:
+            # A different number of pathways changes every bar, so start over
+            for attribute in list(self.axes):
+                self._removeAxes(attribute)
+            self.n_pathways = n_pathways
+
+        attributes = [attribute for attribute, _, _, _ in alignments]
+        for attribute in list(self.axes):
+            if attribute not in attributes:
+                self._removeAxes(attribute)
+        for attribute in attributes:
+            if attribute not in self.axes:
+                self._addAxes(attribute)
+        self.axes = OrderedDict((attribute, self.axes[attribute]) for attribute in attributes)
+
+        self.clearSelection()
+        self._layout()
+
+        for attribute, values, colors, annotation in alignments:
+            self.bars[attribute].set_verts(self._barVertices(values))
+            self.bars[attribute].set_facecolor(colors)
+            self.heights[attribute] = np.asarray(values, dtype=float)
+            self.annotations[attribute].set_text(annotation)
+
+        # Every attribute shares the same y range, as the rebuilt subplots used to with sharey
+        values = np.concatenate([np.asarray(v, dtype=float) for _, v, _, _ in alignments]) if alignments else []
+        if len(values):
+            low, high = min(values.min(), 0), max(values.max(), 0)
+            margin = 0.05 * (high - low) or 0.05
+            for ax in self.axes.values():
+                ax.set_ylim(low - margin, high + margin)
+
+        self.figure.suptitle("Attribute/Pathway Alignment" if self.axes else "")
+        self.canvas.draw_idle()
+
+    def _addAxes(self, attribute):
+        ax = self.figure.add_subplot(1, 1, 1, label=attribute)
+        self.heights[attribute] = np.zeros(self.n_pathways)
+        self.bars[attribute] = PolyCollection(self._barVertices(self.heights[attribute]), facecolors='grey',
+                                              picker=True)
+        ax.add_collection(self.bars[attribute])
+        ax.axhline(0, color='grey', linewidth=0.8)
+        ax.set_xlim(-0.5, self.n_pathways - 0.5)
+        ax.set_ylabel(attribute)
+        self.annotations[attribute] = ax.text(0.99, 0.95, "", transform=ax.transAxes, ha='right', va='top',
+                                              fontsize='small')
+        self.axes[attribute] = ax
+
+    def _removeAxes(self, attribute):
+        ax = self.axes.pop(attribute)
+        if self.highlight is not None and self.highlight.axes is ax:
+            self.highlight = None
+            self.selection = None
+        self.figure.delaxes(ax)
+        del self.bars[attribute]
+        del self.heights[attribute]
+        del self.annotations[attribute]
+
+    def _barVertices(self, values):
+        # (n_pathways, 4, 2) corners of every bar, going up from zero
+        values = np.zeros(self.n_pathways) if len(values) == 0 else np.asarray(values, dtype=float)
+        left = np.arange(len(values)) - BAR_WIDTH / 2
+        vertices = np.zeros((len(values), 4, 2))
+        vertices[:, :2, 0] = left[:, None]
+        vertices[:, 2:, 0] = left[:, None] + BAR_WIDTH
+        vertices[:, 1:3, 1] = values[:, None]
+        return vertices
+
+    def _layout(self):
+        # Stack the axes in order; only the top and bottom ones carry pathway labels
+        if not self.axes:
+            return
+
+        x = np.arange(self.n_pathways)
+        labels = ['pathway_{}'.format(pw) for pw in x]
+        grid = GridSpec(len(self.axes), 1, figure=self.figure)
+        last = len(self.axes) - 1
+        for i, ax in enumerate(self.axes.values()):
+            ax.set_subplotspec(grid[i])
+
+            role = 'top' if i == 0 else 'bottom' if i == last else 'inner'
+            if getattr(ax, '_pathways_role', None) == role:
+                continue
+            ax._pathways_role = role
+
+            if role == 'top':
+                ax.xaxis.set_ticks_position('top')
+                ax.set_xticks(x, labels=labels, rotation=60, ha='left')
+            elif role == 'bottom':
+                ax.xaxis.set_ticks_position('bottom')
+                ax.set_xticks(x, labels=labels, rotation=60, ha='right')
+            else:
+                # Inner axes get no ticks at all; hundreds of unlabeled tick marks per axes dominate drawing time
+                ax.set_xticks([])
+
+    def setSelection(self, attribute, pathway):
+        ax = self.axes[attribute]
+
+        if self.highlight is None or self.highlight.axes is not ax:
+            if self.highlight is not None:
+                self.highlight.remove()
+            self.highlight = Rectangle((0, 0), 0, 0, facecolor='red', animated=True)
+            ax.add_patch(self.highlight)
+
+        self.highlight.set_bounds(pathway - BAR_WIDTH / 2, 0, BAR_WIDTH, self.heights[attribute][pathway])
+        self.selection = (attribute, pathway)
+        self._blit()
+
+    def clearSelection(self):
+        if self.highlight is not None:
+            self.highlight.remove()
+        self.highlight = None
+        self.selection = None
+
+    def _on_draw(self, event):
+        # A full redraw happened: keep its pixels so the highlight can be redrawn on its own
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        if self.highlight is not None:
+            self.highlight.axes.draw_artist(self.highlight)
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.highlight.axes.draw_artist(self.highlight)
+        self.canvas.blit(self.figure.bbox)
+
+    def _on_pick(self, event):
+        if event.mouseevent.button is not MouseButton.LEFT or self.on_select is None:
+            return
+
+        for attribute, bars in self.bars.items():
+            if event.artist is bars and len(event.ind):
+                self.on_select(attribute, int(event.ind[0]))
+                return
+
+
+class HeatmapPlot:
+    """
+    The whole attribute x pathway alignment grid drawn as a single image.
+
+    When the visible part of the grid has more cells than the axes have pixels, blocks of cells are reduced to
+    the value of largest magnitude, so strong alignments stay visible. The image is rebuilt for the visible
+    window whenever the view limits change, so zooming in recovers the individual cells. Hovering reports
+    on_hover(attribute, pathway, value) and clicking on_select(attribute, pathway); when a pixel covers a block
+    of cells, the block's strongest cell is the one reported.
+    """
+
+    def __init__(self, canvas, on_select=None, on_hover=None):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.on_select = on_select
+        self.on_hover = on_hover
+
+        self.ax = None
+        self.image = None
+        self.colorbar = None
+        self.highlight = None
+        self.attributes = []
+        self.grid = np.zeros((0, 0))
+        # Rows, columns and block size the current image was reduced from
+        self.window = None
+
+        self.canvas.mpl_connect('motion_notify_event', self._on_motion)
+        self.canvas.mpl_connect('button_press_event', self._on_press)
+
+    def clear(self):
+        if self.ax is not None:
+            if self.colorbar is not None:
+                self.colorbar.remove()
+            self.figure.delaxes(self.ax)
+        self.ax = None
+        self.image = None
+        self.colorbar = None
+        self.highlight = None
+        self.attributes = []
+        self.grid = np.zeros((0, 0))
+        self.window = None
+        self.figure.suptitle("")
+        self.canvas.draw_idle()
+
+    def update(self, attributes, grid):
+        """
+        attributes are the grid's row labels; grid is (n_attributes, n_pathways).
+        """
+        self.attributes = list(attributes)
+        self.grid = np.asarray(grid, dtype=float).reshape(len(self.attributes), -1)
+        if self.grid.size == 0:
+            self.clear()
+            return
+
+        if self.ax is None:
+            self.ax = self.figure.add_subplot(1, 1, 1)
+            self.image = self.ax.imshow(np.zeros((1, 1)), cmap='coolwarm', aspect='auto', interpolation='nearest')
+            self.colorbar = self.figure.colorbar(self.image, ax=self.ax)
+            self.ax.xaxis.set_major_locator(MaxNLocator(nbins='auto', integer=True))
+            self.ax.yaxis.set_major_locator(MaxNLocator(nbins='auto', integer=True))
+            self.ax.xaxis.set_major_formatter(FuncFormatter(self._pathwayLabel))
+            self.ax.yaxis.set_major_formatter(FuncFormatter(self._attributeLabel))
+            self.ax.callbacks.connect('xlim_changed', self._on_limits)
+            self.ax.callbacks.connect('ylim_changed', self._on_limits)
+
+        if self.highlight is not None:
+            self.highlight.remove()
+            self.highlight = None
+
+        limit = np.abs(self.grid).max() or 1
+        self.image.set_clim(-limit, limit)
+
+        # Attributes run down the rows, top to bottom, like the stacked bar charts
+        n_attributes, n_pathways = self.grid.shape
+        self.ax.set_xlim(-0.5, n_pathways - 0.5)
+        self.window = None
+        self.ax.set_ylim(n_attributes - 0.5, -0.5)
+        self._render()
+
+        self.figure.suptitle("Attribute/Pathway Alignment")
+        self.canvas.draw_idle()
+
+    def _attributeLabel(self, value, position):
+        row = int(round(value))
+        return self.attributes[row] if 0 <= row < len(self.attributes) else ""
+
+    def _pathwayLabel(self, value, position):
+        column = int(round(value))
+        return f"pathway_{column}" if 0 <= column < self.grid.shape[1] else ""
+
+    def _on_limits(self, ax):
+        self._render()
+
+    def _render(self):
+        # Reduce the visible window of the grid to at most one block per pixel
+        n_attributes, n_pathways = self.grid.shape
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        c0, c1 = max(int(np.floor(x0 + 0.5)), 0), min(int(np.ceil(x1 + 0.5)), n_pathways)
+        r0, r1 = max(int(np.floor(y0 + 0.5)), 0), min(int(np.ceil(y1 + 0.5)), n_attributes)
+        if c1 <= c0 or r1 <= r0:
+            return
+
+        bbox = self.ax.get_window_extent()
+        bx = max(int(np.ceil((c1 - c0) / max(bbox.width, 1))), 1)
+        by = max(int(np.ceil((r1 - r0) / max(bbox.height, 1))), 1)
+
+        if (r0, r1, c0, c1, by, bx) == self.window:
+            return
+        self.window = (r0, r1, c0, c1, by, bx)
+        reduced = self._reduce(self.grid[r0:r1, c0:c1], by, bx)
+        self.image.set_data(reduced)
+        # Each reduced pixel spans its whole block of cells
+        self.image.set_extent((c0 - 0.5, c0 + reduced.shape[1] * bx - 0.5, r0 + reduced.shape[0] * by - 0.5, r0 - 0.5))
+
+    @staticmethod
+    def _reduce(values, by, bx):
+        if by == 1 and bx == 1:
+            return values
+        rows, columns = values.shape
+        padded = np.zeros((-(-rows // by) * by, -(-columns // bx) * bx))
+        padded[:rows, :columns] = values
+        blocks = padded.reshape(padded.shape[0] // by, by, padded.shape[1] // bx, bx)
+        # Keep the sign of each block's largest magnitude
+        flat = blocks.transpose(0, 2, 1, 3).reshape(blocks.shape[0], blocks.shape[2], by * bx)
+        strongest = np.abs(flat).argmax(axis=2)
+        return np.take_along_axis(flat, strongest[..., None], axis=2)[..., 0]
+
+    def _cell(self, event):
+        # The (attribute row, pathway) under the mouse, or the strongest cell of the block it is in
+        if self.window is None or event.inaxes is not self.ax or event.xdata is None:
+            return None
+
+        r0, _, c0, _, by, bx = self.window
+        column, row = int(round(event.xdata)), int(round(event.ydata))
+        if not (0 <= row < self.grid.shape[0] and 0 <= column < self.grid.shape[1]):
+            return None
+        if by > 1 or bx > 1:
+            top, left = r0 + (row - r0) // by * by, c0 + (column - c0) // bx * bx
+            block = self.grid[top:top + by, left:left + bx]
+            row, column = np.unravel_index(np.abs(block).argmax(), block.shape)
+            row, column = int(top + row), int(left + column)
+        return row, column
+
+    def setSelection(self, attribute, pathway):
+        row = self.attributes.index(attribute)
+        if self.highlight is None:
+            self.highlight = Rectangle((0, 0), 1, 1, fill=False, edgecolor='black', linewidth=1.5)
+            self.ax.add_patch(self.highlight)
+        self.highlight.set_xy((pathway - 0.5, row - 0.5))
+        self.canvas.draw_idle()
+
+    def _on_motion(self, event):
+        cell = self._cell(event)
+        if cell is None or self.on_hover is None:
+            return
+        row, column = cell
+        self.on_hover(self.attributes[row], column, self.grid[row, column])
+
+    def _on_press(self, event):
+        # Ignore clicks made while zooming or panning
+        if event.button is not MouseButton.LEFT or self.on_select is None or self.canvas.widgetlock.locked():
+            return
+        toolbar = getattr(self.canvas, 'toolbar', None)
+        if toolbar is not None and toolbar.mode:
+            return
+
+        cell = self._cell(event)
+        if cell is not None:
+            self.on_select(self.attributes[cell[0]], cell[1])
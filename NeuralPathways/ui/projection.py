@@ -0,0 +1,178 @@
+import numpy as np
+
+from matplotlib import colormaps
+from matplotlib.backend_bases import MouseButton
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from qtpy import QtWidgets
+
+import NeuralPathways.session as s
+import NeuralPathways.pathways as p
+
+from NeuralPathways.stats import bin_indices, binned_class_counts
+from NeuralPathways.utilities import NavigationToolbar
+
+MAX_LEGEND_CLASSES = 20
+
+
+class ProjectionDialog(QtWidgets.QDialog):
+    """
+    Density view of the instances projected onto two pathways, colored by the classes of an attribute.
+
+    The points are binned into a 2-D histogram per class and drawn as one image: a cell's color mixes the
+    colors of the classes in it, and its opacity grows with the log of its count. Only the visible range is
+    binned, so zooming in re-bins at full resolution. Clicking a cell lists its instances in the inspector.
+    """
+
+    def __init__(self, on_cell_select=None, parent=None):
+        QtWidgets.QDialog.__init__(self, parent)
+        self.setWindowTitle("Pathway Projection")
+        self.resize(800, 700)
+        self.on_cell_select = on_cell_select
+
+        self.rows = None
+        self.x = None
+        self.y = None
+        self.codes = None
+        self.classes = []
+        self.image = None
+        self.window = None
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+
+        n_pathways = s.PATHWAYS_ACTIVATIONS.shape[1]
+        hLayoutChoices = QtWidgets.QHBoxLayout()
+        self.xPathwaySpinbox = QtWidgets.QSpinBox()
+        self.xPathwaySpinbox.setRange(0, n_pathways - 1)
+        self.yPathwaySpinbox = QtWidgets.QSpinBox()
+        self.yPathwaySpinbox.setRange(0, n_pathways - 1)
+        self.yPathwaySpinbox.setValue(min(1, n_pathways - 1))
+        self.attributeChoiceBox = QtWidgets.QComboBox()
+        self.attributeChoiceBox.addItems(["<None Selected>"] + [a for a, info in s.ATTRIBUTE_COLUMN_INFO.items()
+                                                                if info['class_rows'] is not None])
+        if s.GOLD_LABEL_ATTRIBUTE in s.ATTRIBUTE_COLUMN_INFO:
+            self.attributeChoiceBox.setCurrentText(s.GOLD_LABEL_ATTRIBUTE)
+        self.binsSpinbox = QtWidgets.QSpinBox()
+        self.binsSpinbox.setRange(10, 2000)
+        self.binsSpinbox.setValue(200)
+        for spinbox in (self.xPathwaySpinbox, self.yPathwaySpinbox, self.binsSpinbox):
+            spinbox.setKeyboardTracking(False)
+
+        hLayoutChoices.addWidget(QtWidgets.QLabel("X Pathway:"))
+        hLayoutChoices.addWidget(self.xPathwaySpinbox)
+        hLayoutChoices.addWidget(QtWidgets.QLabel("Y Pathway:"))
+        hLayoutChoices.addWidget(self.yPathwaySpinbox)
+        hLayoutChoices.addWidget(QtWidgets.QLabel("Color By:"))
+        hLayoutChoices.addWidget(self.attributeChoiceBox, 1)
+        hLayoutChoices.addWidget(QtWidgets.QLabel("Bins:"))
+        hLayoutChoices.addWidget(self.binsSpinbox)
+        vLayout.addLayout(hLayoutChoices)
+
+        self.plotFigure = Figure()
+        self.plotView = FigureCanvasQTAgg(self.plotFigure)
+        self.plotToolbar = NavigationToolbar(self.plotView, self)
+        self.ax = self.plotFigure.add_subplot(1, 1, 1)
+        vLayout.addWidget(self.plotToolbar)
+        vLayout.addWidget(self.plotView, 1)
+
+        self.statusLbl = QtWidgets.QLabel("Click on a cell to inspect its instances.")
+        self.statusLbl.setWordWrap(True)
+        vLayout.addWidget(self.statusLbl)
+
+        self.xPathwaySpinbox.valueChanged.connect(self.project)
+        self.yPathwaySpinbox.valueChanged.connect(self.project)
+        self.attributeChoiceBox.currentTextChanged.connect(self.project)
+        self.binsSpinbox.valueChanged.connect(self._render)
+        self.plotView.mpl_connect('button_press_event', self._on_press)
+
+        self.project()
+
+    def project(self):
+        px, py = self.xPathwaySpinbox.value(), self.yPathwaySpinbox.value()
+        self.rows, self.x, self.y, self.codes, self.classes = p.projection_points(
+            px, py, self.attributeChoiceBox.currentText())
+
+        self.ax.clear()
+        self.image = None
+        self.window = None
+        if len(self.rows) == 0:
+            self.plotView.draw_idle()
+            return
+
+        cmap = colormaps['tab10'] if len(self.classes) <= 10 else colormaps['tab20']
+        self.colors = np.array([cmap(k % cmap.N)[:3] for k in range(len(self.classes))])
+
+        self.image = self.ax.imshow(np.zeros((1, 1, 4)), origin='lower', aspect='auto', interpolation='nearest')
+        self.ax.set_xlabel(f"pathway_{px}")
+        self.ax.set_ylabel(f"pathway_{py}")
+        if len(self.classes) > 1:
+            self.ax.legend(handles=[Patch(color=self.colors[k], label=str(cls))
+                                    for k, cls in enumerate(self.classes[:MAX_LEGEND_CLASSES])],
+                           loc='upper right', fontsize='small')
+
+        # Setting the limits turns autoscaling off; clearing the axes dropped the limit callbacks
+        self.ax.set_xlim(*self._range(self.x))
+        self.ax.set_ylim(*self._range(self.y))
+        self.ax.callbacks.connect('xlim_changed', self._on_limits)
+        self.ax.callbacks.connect('ylim_changed', self._on_limits)
+        self.plotToolbar.update()
+        self._render()
+
+    @staticmethod
+    def _range(values):
+        low, high = float(values.min()), float(values.max())
+        return (low - 0.5, high + 0.5) if low == high else (low, high)
+
+    def _on_limits(self, ax):
+        self._render()
+
+    def _render(self):
+        if self.image is None:
+            return
+
+        x_range, y_range = self.ax.get_xlim(), self.ax.get_ylim()
+        bins = self.binsSpinbox.value()
+        if (x_range, y_range, bins) == self.window:
+            return
+        self.window = (x_range, y_range, bins)
+
+        counts = binned_class_counts(self.x, self.y, self.codes, len(self.classes), x_range, y_range, (bins, bins))
+        total = counts.sum(axis=0)
+
+        # Mix the class colors by their share of each cell; empty cells are transparent
+        rgba = np.zeros(total.shape + (4,))
+        rgba[..., :3] = np.tensordot(counts, self.colors, axes=(0, 0)) / np.maximum(total, 1)[..., None]
+        rgba[..., 3] = np.log1p(total) / max(np.log1p(total.max()), 1)
+        self.image.set_data(rgba)
+        self.image.set_extent((*x_range, *y_range))
+        self.plotView.draw_idle()
+
+    def _on_press(self, event):
+        # Ignore clicks made while zooming or panning
+        if event.button is not MouseButton.LEFT or event.inaxes is not self.ax or self.window is None:
+            return
+        if self.plotToolbar.mode:
+            return
+
+        x_range, y_range, bins = self.window
+        cx = bin_indices(np.array([event.xdata]), x_range, bins)[0]
+        cy = bin_indices(np.array([event.ydata]), y_range, bins)[0]
+        if cx < 0 or cy < 0:
+            return
+
+        inside = (bin_indices(self.x, x_range, bins) == cx) & (bin_indices(self.y, y_range, bins) == cy)
+        rows, values = self.rows[inside], self.x[inside]
+        order = np.argsort(values)[::-1]
+
+        width, height = (x_range[1] - x_range[0]) / bins, (y_range[1] - y_range[0]) / bins
+        x0, y0 = x_range[0] + cx * width, y_range[0] + cy * height
+        description = (f"{len(rows)} instances with pathway_{self.xPathwaySpinbox.value()} in "
+                       f"[{x0:.3f}, {x0 + width:.3f}) and pathway_{self.yPathwaySpinbox.value()} in "
+                       f"[{y0:.3f}, {y0 + height:.3f})")
+        self.statusLbl.setText(description)
+
+        if self.on_cell_select is not None:
+            attribute = self.attributeChoiceBox.currentText()
+            self.on_cell_select(rows[order], values[order], description,
+                                attribute if attribute in s.ATTRIBUTE_COLUMN_INFO else None)
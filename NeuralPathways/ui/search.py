@@ -0,0 +1,191 @@
+from qtpy import QtWidgets
+from qtpy.QtCore import Qt
+from qtpy.QtGui import QStandardItemModel, QStandardItem
+
+import NeuralPathways.session as s
+import NeuralPathways.pathways as p
+
+from NeuralPathways.models.inspector_model import InspectorModel
+
+
+class NeuronScanDialog(QtWidgets.QDialog):
+
+    def __init__(self, parent=None):
+        QtWidgets.QDialog.__init__(self, parent)
+        self.setWindowTitle("Neuron Alignment Scan")
+        self.resize(600, 500)
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+
+        hLayoutScan = QtWidgets.QHBoxLayout()
+        self.topNSpinbox = QtWidgets.QSpinBox()
+        self.topNSpinbox.setRange(1, 1000)
+        self.topNSpinbox.setValue(20)
+        self.scanBtn = QtWidgets.QPushButton("Scan")
+        hLayoutScan.addWidget(QtWidgets.QLabel("Top N Neurons:"))
+        hLayoutScan.addWidget(self.topNSpinbox)
+        hLayoutScan.addWidget(self.scanBtn)
+        vLayout.addLayout(hLayoutScan)
+
+        self.statusLbl = QtWidgets.QLabel("Scans every neuron against the chosen class of each checked attribute.")
+        vLayout.addWidget(self.statusLbl)
+
+        self.resultsModel = QStandardItemModel(0, 3)
+        self.resultsView = QtWidgets.QTreeView()
+        self.resultsView.setModel(self.resultsModel)
+        self.resultsView.setAlternatingRowColors(True)
+        vLayout.addWidget(self.resultsView)
+
+        self.scanBtn.clicked.connect(self.scan)
+        self._refreshResults()
+
+    def scan(self):
+        if s.ACTIVATION_MATRIX is None:
+            self.statusLbl.setText("ERROR: Need to load activations.")
+            return
+
+        self.statusLbl.setText("PROCESSING: Please wait...")
+        p.scan_neurons(top_n=self.topNSpinbox.value())
+        self.statusLbl.setText(f"DONE: scanned {len(s.ACTIVATION_NEURONS)} neurons.")
+        self._refreshResults()
+
+    def _refreshResults(self):
+        self.resultsModel.clear()
+
+        for attribute, result in s.NEURON_SCAN_RESULTS.items():
+            attribute_item = QStandardItem(f"{attribute} = {result['class']}")
+
+            layers_item = QStandardItem("Layers")
+            for layer, count in result['layers'].items():
+                layers_item.appendRow((QStandardItem(layer),
+                                       QStandardItem(f"{count} of {len(result['neurons'])}"),
+                                       QStandardItem()))
+            attribute_item.appendRow((layers_item, QStandardItem(), QStandardItem()))
+
+            for name, layer, r in result['neurons']:
+                attribute_item.appendRow((QStandardItem(name), QStandardItem(layer), QStandardItem(f"{r:.03f}")))
+
+            self.resultsModel.appendRow((attribute_item, QStandardItem(), QStandardItem()))
+
+        self.resultsModel.setHeaderData(0, Qt.Horizontal, "Neuron")
+        self.resultsModel.setHeaderData(1, Qt.Horizontal, "Layer")
+        self.resultsModel.setHeaderData(2, Qt.Horizontal, "Correlation")
+        self.resultsView.expandToDepth(0)
+
+
+class ConjunctionSearchDialog(QtWidgets.QDialog):
+
+    def __init__(self, parent=None):
+        QtWidgets.QDialog.__init__(self, parent)
+        self.setWindowTitle("Attribute Conjunction Search")
+        self.resize(700, 500)
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+
+        hLayoutSearch = QtWidgets.QHBoxLayout()
+        self.topKSpinbox = QtWidgets.QSpinBox()
+        self.topKSpinbox.setRange(1, 1000)
+        self.topKSpinbox.setValue(20)
+        self.minSupportSpinbox = QtWidgets.QSpinBox()
+        self.minSupportSpinbox.setRange(1, 1000000)
+        self.minSupportSpinbox.setValue(s.DEFAULT_CONJUNCTION_SUPPORT)
+        self.searchBtn = QtWidgets.QPushButton("Search")
+        hLayoutSearch.addWidget(QtWidgets.QLabel("Top Results:"))
+        hLayoutSearch.addWidget(self.topKSpinbox)
+        hLayoutSearch.addWidget(QtWidgets.QLabel("Min. Support:"))
+        hLayoutSearch.addWidget(self.minSupportSpinbox)
+        hLayoutSearch.addWidget(self.searchBtn)
+        vLayout.addLayout(hLayoutSearch)
+
+        self.statusLbl = QtWidgets.QLabel("Searches pairs of classes from different checked attributes.")
+        self.statusLbl.setWordWrap(True)
+        vLayout.addWidget(self.statusLbl)
+
+        self.resultsModel = QStandardItemModel(0, 4)
+        self.resultsView = QtWidgets.QTreeView()
+        self.resultsView.setModel(self.resultsModel)
+        self.resultsView.setAlternatingRowColors(True)
+        vLayout.addWidget(self.resultsView)
+
+        self.searchBtn.clicked.connect(self.search)
+        self._refreshResults()
+
+    def search(self):
+        if s.PATHWAYS_ACTIVATIONS is None:
+            self.statusLbl.setText("ERROR: Need to extract pathways.")
+            return
+
+        self.statusLbl.setText("PROCESSING: Please wait...")
+        p.search_conjunctions(top_k=self.topKSpinbox.value(), min_support=self.minSupportSpinbox.value())
+        message = f"DONE: {len(s.CONJUNCTION_RESULTS)} conjunctions found."
+        stats = s.CONJUNCTION_SEARCH_STATS
+        if stats:
+            message += (f" {stats['pairs']:,} pairs: {stats['pruned_support']:,} pruned by support, "
+                        f"{stats['pruned_bound']:,} by bound, {stats['evaluated']:,} evaluated.")
+        self.statusLbl.setText(message)
+        self._refreshResults()
+
+    def _refreshResults(self):
+        self.resultsModel.clear()
+
+        for result in s.CONJUNCTION_RESULTS:
+            (a, a_cls), (b, b_cls) = result['conjunction']
+            self.resultsModel.appendRow((QStandardItem(f"{a} = {a_cls} AND {b} = {b_cls}"),
+                                         QStandardItem(f"pathway_{result['pathway']}"),
+                                         QStandardItem(f"{result['correlation']:.03f}"),
+                                         QStandardItem(str(result['support']))))
+
+        self.resultsModel.setHeaderData(0, Qt.Horizontal, "Conjunction")
+        self.resultsModel.setHeaderData(1, Qt.Horizontal, "Pathway")
+        self.resultsModel.setHeaderData(2, Qt.Horizontal, "Correlation")
+        self.resultsModel.setHeaderData(3, Qt.Horizontal, "Support")
+
+
+class NeighborsDialog(QtWidgets.QDialog):
+
+    def __init__(self, row, data_column, attribute, parent=None):
+        QtWidgets.QDialog.__init__(self, parent)
+        self.setWindowTitle("Similar Instances")
+        self.resize(600, 400)
+        self.row = row
+        self.data_column = data_column
+        self.attribute = attribute
+
+        vLayout = QtWidgets.QVBoxLayout(self)
+
+        hLayoutK = QtWidgets.QHBoxLayout()
+        self.kSpinbox = QtWidgets.QSpinBox()
+        self.kSpinbox.setRange(1, 10000)
+        self.kSpinbox.setValue(20)
+        self.kSpinbox.setKeyboardTracking(False)
+        hLayoutK.addWidget(QtWidgets.QLabel("Nearest Instances:"))
+        hLayoutK.addWidget(self.kSpinbox)
+        vLayout.addLayout(hLayoutK)
+
+        self.statusLbl = QtWidgets.QLabel()
+        self.statusLbl.setWordWrap(True)
+        vLayout.addWidget(self.statusLbl)
+
+        self.resultsModel = InspectorModel(valueHeader="Distance", parent=self)
+        self.resultsView = QtWidgets.QTreeView()
+        self.resultsView.setModel(self.resultsModel)
+        self.resultsView.setAlternatingRowColors(True)
+        self.resultsView.setRootIsDecorated(False)
+        self.resultsView.setUniformRowHeights(True)
+        vLayout.addWidget(self.resultsView)
+
+        self.kSpinbox.valueChanged.connect(self.search)
+        self.search()
+
+    def search(self):
+        df = s.ATTRIBUTE_MODEL.df
+        result = p.nearest_instances(self.row, self.kSpinbox.value())
+        if result is None:
+            self.statusLbl.setText("ERROR: The neighbor index is still being built. Please try again shortly.")
+            return
+
+        rows, distances = result
+        metric = s.PATHWAYS_NEIGHBOR_INDEX.metric
+        self.statusLbl.setText(f'Instances nearest to "{df[self.data_column].iat[self.row]}" in pathway space '
+                               f'({metric} distance).')
+        self.resultsModel.setInstances(rows, distances, df[self.data_column], df[self.attribute])
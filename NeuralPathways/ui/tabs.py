@@ -6,6 +6,7 @@ from NeuralPathways.ui.attributes import AttributeWidget
 from NeuralPathways.ui.activations import ActivationWidget
 from NeuralPathways.ui.analysis import AnalysisWidget
 from NeuralPathways.ui.causality import CausalityWidget
+from NeuralPathways.ui.derived import DerivedAttributeWidget
 from NeuralPathways.utilities import SignalBridge
 
 class AppTabs(QWidget):
@@ -18,7 +19,7 @@ class AppTabs(QWidget):
         # Initialize tab screen
         self.tabs = QTabWidget()
         self.tab_attribue_view = QWidget()
-        #self.tab_create_attributes = QWidget()
+        self.tab_create_attributes = QWidget()
         self.tab_activation_viewer = QWidget()
         self.tab_pathways_viewer = QWidget()
         self.tab_causal_structure = QWidget()
@@ -26,7 +27,7 @@ class AppTabs(QWidget):
 
         # Add tabs
         self.tabs.addTab(self.tab_attribue_view, "Attributes")
-        #self.tabs.addTab(self.tab_create_attributes, "Create Attributes")
+        self.tabs.addTab(self.tab_create_attributes, "Create Attributes")
         self.tabs.addTab(self.tab_activation_viewer, "Extract")
         self.tabs.addTab(self.tab_pathways_viewer, "Pathways")
         #self.tabs.addTab(self.tab_causal_structure, "Causal Structure")
@@ -40,6 +41,12 @@ class AppTabs(QWidget):
         #self.debugButton.clicked.connect(self.debugPrint)
         self.tab_attribue_view.setLayout(self.tab_attribue_view.layout)
 
+        # Create derived attributes tab
+        self.tab_create_attributes.layout = QVBoxLayout(self)
+        self.derivedAttributeWidget = DerivedAttributeWidget(self.bridgeLoadAttributes)
+        self.tab_create_attributes.layout.addWidget(self.derivedAttributeWidget)
+        self.tab_create_attributes.setLayout(self.tab_create_attributes.layout)
+
         # Create Activation Viewer tab
         self.tab_activation_viewer.layout = QVBoxLayout(self)
         self.activationWidget = ActivationWidget()
@@ -1,16 +1,19 @@
+import threading
+import traceback
+
 import numpy as np
 
 from functools import cached_property
-from qtpy.QtCore import QObject, Signal
-from qtpy.QtWidgets import QStyledItemDelegate
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Signal
+from qtpy.QtWidgets import QStyledItemDelegate, QComboBox
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
 
-from scipy.stats import pearsonr
 from sklearn.base import BaseEstimator, ClassifierMixin
 from sklearn.utils.validation import check_X_y, check_array, check_is_fitted
-from sklearn.utils.multiclass import unique_labels
 from sklearn.metrics import euclidean_distances
 
+from NeuralPathways.stats import anova_f, binned_mutual_information, class_correlations, correlation_pvalues
+
 
 class SignalBridge(QObject):
     valueUpdated = Signal()
@@ -22,61 +25,135 @@ class SignalBridge(QObject):
         self.valueUpdated.emit()
 
 
+class WorkerSignals(QObject):
+    finished = Signal(object)
+    error = Signal(str)
+    progress = Signal(int)
+    result = Signal(object)
+
+
+class Worker(QRunnable):
+    # Runs fn(*args, **kwargs) on the global thread pool and reports back through Qt signals.
+    # Long tasks can be given worker.signals.progress.emit and worker.cancelled as callbacks, and
+    # worker.signals.result.emit to hand over partial results before they finish.
+
+    def __init__(self, fn, *args, **kwargs):
+        QRunnable.__init__(self)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self):
+        QThreadPool.globalInstance().start(self)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
 class NavigationToolbar(NavigationToolbar2QT):
     # only display the buttons we need
     toolitems = [t for t in NavigationToolbar2QT.toolitems if
                  t[0] in ('Home', 'Pan', 'Zoom', 'Save')]
 
 
-class PearsonCorrelationClassifier(BaseEstimator, ClassifierMixin):
-    def __init__(self, use_magnitude=False):
-        self.use_magnitude = use_magnitude
+class AlignmentClassifier(BaseEstimator, ClassifierMixin):
+    # Shared scaffolding for the statistic-based "classifiers": each row of coef_ aligns the pathways with a class
 
+    def __init__(self):
         # This is used to be consistent with Logistic Regression
         self.coef_ = []
-        self.correlation_matrix_ = None
         self.p_value_matrix_ = None
         self.classes_ = None
 
-
-    def fit(self, X, y):
+    def _encode(self, X, y):
         # Check that X and y have correct shape
         X, y = check_X_y(X, y)
 
         # Store the classes seen during fit
-        self.classes_ = unique_labels(y)
+        self.classes_, codes = np.unique(y, return_inverse=True)
+        return X, codes
 
-        # In the binary case we only need a vector
-        if len(self.classes_) == 2 and self.classes_[0] == 0 and self.classes_[1] == 1:
-            self.correlation_matrix_ = np.zeros((1, X.shape[1]))
-            self.p_value_matrix_ = np.zeros((1, X.shape[1]))
+    def _is_binary(self):
+        return len(self.classes_) == 2 and self.classes_[0] == 0 and self.classes_[1] == 1
 
-            for i in range(X.shape[1]):
-                self.correlation_matrix_[0, i], self.p_value_matrix_[0, i] = pearsonr(X[:, i], y)
+    def predict(self, X):
+        # Check if fit has been called
+        check_is_fitted(self)
 
-        else:
-            self.correlation_matrix_ = np.zeros((len(self.classes_), X.shape[1]))
-            self.p_value_matrix_ = np.zeros((len(self.classes_), X.shape[1]))
+        # Input validation
+        X = check_array(X)
+
+        #closest = np.argmin(euclidean_distances(X, self.X_), axis=1)
+        return [self.classes_[0]] * X.shape[0]
+
+
+class PearsonCorrelationClassifier(AlignmentClassifier):
+    def __init__(self, use_magnitude=False):
+        super().__init__()
+        self.use_magnitude = use_magnitude
+        self.correlation_matrix_ = None
+
+    def fit(self, X, y):
+        X, codes = self._encode(X, y)
+
+        # All classes against all pathways in one pass
+        self.correlation_matrix_ = class_correlations(X, codes, len(self.classes_))
 
-            for i, cls in enumerate(self.classes_):
-                for j in range(X.shape[1]):
-                    target = np.array([1 if elem == cls else 0 for elem in y])
-                    self.correlation_matrix_[i, j], self.p_value_matrix_[i, j] = pearsonr(X[:, j], target)
+        # In the binary case we only need a vector
+        if self._is_binary():
+            self.correlation_matrix_ = self.correlation_matrix_[1:]
 
+        self.p_value_matrix_ = correlation_pvalues(self.correlation_matrix_, X.shape[0])
         self.coef_ = self.correlation_matrix_
 
         # Return the classifier
         return self
 
-    def predict(self, X):
-        # Check if fit has been called
-        check_is_fitted(self)
 
-        # Input validation
-        X = check_array(X)
+class AnovaFClassifier(AlignmentClassifier):
+    # The F-statistic compares all classes at once, so coef_ has a single row shared by every class
 
-        #closest = np.argmin(euclidean_distances(X, self.X_), axis=1)
-        return [self.classes_[0]] * X.shape[0]
+    def fit(self, X, y):
+        X, codes = self._encode(X, y)
+
+        f, p_values = anova_f(X, codes, len(self.classes_))
+        self.coef_ = f[None, :]
+        self.p_value_matrix_ = p_values[None, :]
+
+        return self
+
+
+class MutualInformationClassifier(AlignmentClassifier):
+    def __init__(self, n_bins=10, ranked=False):
+        super().__init__()
+        self.n_bins = n_bins
+        self.ranked = ranked
+
+    def fit(self, X, y):
+        X, codes = self._encode(X, y)
+
+        self.coef_ = binned_mutual_information(X, codes, len(self.classes_), n_bins=self.n_bins,
+                                               ranked=self.ranked)
+
+        # In the binary case we only need a vector
+        if self._is_binary():
+            self.coef_ = self.coef_[1:]
+
+        return self
 
 
 class AlignmentDelegate(QStyledItemDelegate):
@@ -92,3 +169,28 @@ class AlignmentDelegate(QStyledItemDelegate):
         alignment = self.alignment.get(index.column(), None)
         if alignment is not None:
             option.displayAlignment = alignment
+
+
+class ClassChoiceDelegate(QStyledItemDelegate):
+    # Combo box editor for an attribute's correlation class, created only while the cell is being edited.
+    # The choices come from the model's classes role, so no per-row widgets exist.
+
+    def __init__(self, classes_role, parent=None):
+        QStyledItemDelegate.__init__(self, parent)
+        self.classes_role = classes_role
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems([str(cls) for cls in index.data(self.classes_role)])
+        editor.activated.connect(lambda _: self._commit(editor))
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data())
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText())
+
+    def _commit(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
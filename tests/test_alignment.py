@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+
+import NeuralPathways.session as s
+import NeuralPathways.pathways as p
+
+from NeuralPathways.utilities import PearsonCorrelationClassifier, AnovaFClassifier
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(s, 'ATTRIBUTE_CHECKLIST_STATE', {})
+    monkeypatch.setattr(s, 'ATTRIBUTE_ALIGNMENT_CLFS', {})
+    monkeypatch.setattr(s, 'ATTRIBUTE_ALIGNMENT_PVALUES', {})
+    monkeypatch.setattr(s, 'ATTRIBUTE_ALIGNMENT_CV_SCORES', {})
+    return s
+
+
+@pytest.mark.parametrize('clf', [PearsonCorrelationClassifier(), LogisticRegression(), AnovaFClassifier()])
+@pytest.mark.parametrize('fit_classes', [['LOC', 'ORG', 'PER'], ['LOC', 'ORG']])
+def test_alignment_of_class_absent_from_fit_rows(session, clf, fit_classes):
+    # The checklist knows MISC, but the rows the alignment was fit on (e.g. filtered rows) have none
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20 * len(fit_classes), 4))
+    y = np.repeat(fit_classes, 20)
+
+    session.ATTRIBUTE_CHECKLIST_STATE['label'] = {'checked': True, 'threshold': 0.1, 'visible': True,
+                                                  'classes': ['MISC'] + fit_classes, 'corr_class': 'MISC'}
+    session.ATTRIBUTE_ALIGNMENT_CLFS['label'] = clf.fit(X, y)
+
+    assert p.class_absent('label')
+    assert np.array_equal(p.alignment_values('label', 4), np.zeros(4))
+
+    values, colors, annotation = p.alignment_bars('label', 4)
+    assert np.array_equal(values, np.zeros(4))
+    assert colors == ['grey'] * 4
+    assert "absent" in annotation
+
+
+def test_alignment_of_class_present(session):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 4))
+    y = np.repeat(['LOC', 'ORG', 'PER'], 20)
+
+    session.ATTRIBUTE_CHECKLIST_STATE['label'] = {'checked': True, 'threshold': 0.1, 'visible': True,
+                                                  'classes': ['LOC', 'ORG', 'PER'], 'corr_class': 'ORG'}
+    clf = session.ATTRIBUTE_ALIGNMENT_CLFS['label'] = PearsonCorrelationClassifier().fit(X, y)
+
+    assert not p.class_absent('label')
+    assert np.array_equal(p.alignment_values('label', 4), clf.coef_[1])